@@ -0,0 +1,62 @@
+"""add appointment date indexes
+
+Revision ID: 3f9a1c2b7d4e
+Revises: d550faa64ac5
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9a1c2b7d4e'
+down_revision = 'd550faa64ac5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_provider_id_date',
+            'appointments',
+            ['provider_id', 'date'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_appointments_user_id_date',
+            'appointments',
+            ['user_id', 'date'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        # the primary key already indexes appointments.id
+        op.drop_index(
+            'ix_appointments_id',
+            table_name='appointments',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_id',
+            'appointments',
+            ['id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_appointments_user_id_date',
+            table_name='appointments',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_appointments_provider_id_date',
+            table_name='appointments',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,34 @@
+"""add provider day occupancy
+
+Revision ID: 5d7e9f1a2b3c
+Revises: 8c2e4b6a1f03
+Create Date: 2026-10-18 11:20:05.318742
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7e9f1a2b3c'
+down_revision = '8c2e4b6a1f03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled by new appointments from now on, run `pipenv run backfill-occupancy`
+    # once after upgrading to count the existing ones
+    op.create_table('provider_day_occupancy',
+    sa.Column('provider_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('booked_count', sa.Integer(), nullable=False),
+    sa.Column('slot_mask', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('provider_id', 'day')
+    )
+
+
+def downgrade():
+    op.drop_table('provider_day_occupancy')
@@ -0,0 +1,86 @@
+"""add appointment slot constraint
+
+Revision ID: 8c2e4b6a1f03
+Revises: 3f9a1c2b7d4e
+Create Date: 2026-10-18 10:03:17.558210
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c2e4b6a1f03'
+down_revision = '3f9a1c2b7d4e'
+branch_labels = None
+depends_on = None
+
+
+DUPLICATED_SLOTS = (
+    'SELECT provider_id, date, count(*) FROM appointments '
+    'GROUP BY provider_id, date HAVING count(*) > 1'
+)
+
+
+def upgrade():
+    # Slots were only checked by the application before, which could race.
+    # Appointments are not deleted here, the duplicates have to be resolved
+    # by hand (the query is in the message) before the migration is re-run.
+    connection = op.get_bind()
+    duplicated = connection.execute(
+        sa.text(f'SELECT count(*) FROM ({DUPLICATED_SLOTS}) AS duplicated')
+    ).scalar()
+    if duplicated:
+        raise RuntimeError(
+            f'{duplicated} provider slots have more than one appointment, '
+            f'list them with "{DUPLICATED_SLOTS}" and keep one appointment per '
+            'slot before running this migration again'
+        )
+
+    # Build the unique index without locking writes, then promote it to a
+    # constraint. The unique index also serves the (provider_id, date)
+    # lookups, so the plain composite index becomes redundant.
+    with op.get_context().autocommit_block():
+        # A failed concurrent build (e.g. a duplicate booked meanwhile)
+        # leaves an INVALID index behind, drop it so the build can be retried
+        invalid = connection.execute(sa.text(
+            "SELECT 1 FROM pg_index "
+            "WHERE indexrelid = to_regclass('uq_appointments_provider_id_date') "
+            "AND NOT indisvalid"
+        )).scalar()
+        if invalid:
+            op.drop_index(
+                'uq_appointments_provider_id_date',
+                table_name='appointments',
+                postgresql_concurrently=True
+            )
+        op.create_index(
+            'uq_appointments_provider_id_date',
+            'appointments',
+            ['provider_id', 'date'],
+            unique=True,
+            postgresql_concurrently=True
+        )
+    op.execute(
+        'ALTER TABLE appointments '
+        'ADD CONSTRAINT uq_appointments_provider_id_date '
+        'UNIQUE USING INDEX uq_appointments_provider_id_date'
+    )
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_appointments_provider_id_date',
+            table_name='appointments',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_provider_id_date',
+            'appointments',
+            ['provider_id', 'date'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+    op.drop_constraint('uq_appointments_provider_id_date', 'appointments', type_='unique')
@@ -0,0 +1,61 @@
+"""add provider schedules
+
+Revision ID: b41c7e2d9a60
+Revises: 5d7e9f1a2b3c
+Create Date: 2026-10-18 14:02:48.901237
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41c7e2d9a60'
+down_revision = '5d7e9f1a2b3c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('provider_schedules',
+    sa.Column('provider_id', postgresql.UUID(as_uuid=True), nullable=False),
+    sa.Column('timezone', sa.String(), nullable=False),
+    sa.Column('slot_minutes', sa.SmallInteger(), nullable=False),
+    sa.Column('opening', sa.SmallInteger(), nullable=False),
+    sa.Column('closing', sa.SmallInteger(), nullable=False),
+    sa.Column('breaks', postgresql.ARRAY(sa.SmallInteger()), nullable=False),
+    sa.Column('working_days', sa.SmallInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('provider_id')
+    )
+    # slot_mask moves from one bit per hour to one bit per 30 minutes cell,
+    # every existing appointment took a whole hour
+    op.alter_column(
+        'provider_day_occupancy', 
+        'slot_mask', 
+        type_=sa.BigInteger(), 
+        postgresql_using='slot_mask::bigint'
+    )
+    op.execute(
+        'UPDATE provider_day_occupancy SET slot_mask = ('
+        'SELECT coalesce(sum(3::bigint << (2 * hour)), 0) '
+        'FROM generate_series(0, 23) AS hour '
+        'WHERE slot_mask & (1::bigint << hour) <> 0)'
+    )
+
+
+def downgrade():
+    op.execute(
+        'UPDATE provider_day_occupancy SET slot_mask = ('
+        'SELECT coalesce(sum(1::bigint << (cell / 2)), 0) '
+        'FROM generate_series(0, 47, 2) AS cell '
+        'WHERE slot_mask & (3::bigint << cell) <> 0)'
+    )
+    op.alter_column(
+        'provider_day_occupancy', 
+        'slot_mask', 
+        type_=sa.Integer(), 
+        postgresql_using='slot_mask::integer'
+    )
+    op.drop_table('provider_schedules')
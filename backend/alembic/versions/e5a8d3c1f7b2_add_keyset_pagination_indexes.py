@@ -0,0 +1,63 @@
+"""add keyset pagination indexes
+
+Revision ID: e5a8d3c1f7b2
+Revises: b41c7e2d9a60
+Create Date: 2026-10-18 15:40:12.674310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8d3c1f7b2'
+down_revision = 'b41c7e2d9a60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_providers_name_id',
+            'users',
+            ['name', 'id'],
+            unique=False,
+            postgresql_where=sa.text('address IS NOT NULL AND is_active'),
+            postgresql_concurrently=True
+        )
+        # (date, id) is the sort key of the user appointments pages
+        op.create_index(
+            'ix_appointments_user_id_date_id',
+            'appointments',
+            ['user_id', 'date', 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_appointments_user_id_date',
+            table_name='appointments',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appointments_user_id_date',
+            'appointments',
+            ['user_id', 'date'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_appointments_user_id_date_id',
+            table_name='appointments',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_users_providers_name_id',
+            table_name='users',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,80 @@
+import functools
+import inspect
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional
+from fastapi import Depends
+
+from app.api import deps
+from app.core.cache import CACHE_TTL, RedisCache
+
+RDC_PARAM = "rdc"
+
+def cached(
+    key: Callable[..., str],
+    ttl: timedelta = CACHE_TTL,
+    tags: Optional[Callable[..., List[str]]] = None,
+    finalize: Optional[Callable[..., Any]] = None,
+) -> Callable:
+    """
+    Cache the value returned by an endpoint through RedisCache.get_or_set
+    (get_or_set_async for async endpoints).\n
+    `key` and `tags` receive the endpoint arguments as keywords. `finalize`
+    receives the (cached or computed) value plus the endpoint arguments and runs
+    on every request, it is where request specific work goes.\n
+    Empty results are cached too. A redis client is injected when the endpoint
+    does not declare an `rdc` parameter itself.\n
+    The endpoint response model must be listed in app.core.cache.CACHED_MODELS
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        signature = inspect.signature(endpoint)
+        inject_rdc = RDC_PARAM not in signature.parameters
+
+        def get_rdc(kwargs: Dict[str, Any]) -> RedisCache:
+            if inject_rdc:
+                return kwargs.pop(RDC_PARAM)
+            return kwargs[RDC_PARAM]
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(**kwargs: Any) -> Any:
+                rdc = get_rdc(kwargs)
+                value = await rdc.get_or_set_async(
+                    key(**kwargs),
+                    lambda: endpoint(**kwargs),
+                    tags=tags(**kwargs) if tags else [],
+                    ttl=ttl
+                )
+                if finalize:
+                    value = finalize(value, **kwargs)
+
+                return value
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(**kwargs: Any) -> Any:
+                rdc = get_rdc(kwargs)
+                value = rdc.get_or_set(
+                    key(**kwargs),
+                    lambda: endpoint(**kwargs),
+                    tags=tags(**kwargs) if tags else [],
+                    ttl=ttl
+                )
+                if finalize:
+                    value = finalize(value, **kwargs)
+
+                return value
+
+        if inject_rdc:
+            rdc_parameter = inspect.Parameter(
+                RDC_PARAM,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=Depends(deps.get_redis),
+                annotation=RedisCache
+            )
+            wrapper.__signature__ = signature.replace(
+                parameters=[*signature.parameters.values(), rdc_parameter]
+            )
+
+        wrapper.cached = True
+        return wrapper
+
+    return decorator
@@ -1,9 +1,12 @@
+import secrets
 from typing import Generator
+from databases import Database
 from fastapi import Header, Depends, HTTPException
 from sqlalchemy.orm.session import Session
 
 from app.core.cache import RedisCache
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.db.session import SessionLocal, database
 from app.crud import crud_user
 from app.models.user import User
 from app.utils import token
@@ -18,27 +21,74 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+def get_async_db() -> Database:
+    """
+    Get the async database, its connection pool is opened on the app startup
+    """
+    return database
+
 def get_redis() -> Generator:
     """
-    Get redis database
+    Get redis database, backed by the process-wide connection pool
+    """
+    yield RedisCache()
+
+def verify_metrics_token(X_Metrics_Token: str = Header(None)) -> None:
+    """
+    Internal endpoints only, they look missing without the METRICS_TOKEN
+    """
+    if not (
+        settings.METRICS_TOKEN and 
+        X_Metrics_Token and 
+        secrets.compare_digest(X_Metrics_Token, settings.METRICS_TOKEN)
+    ):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+def get_token_subject(Authorization: str) -> str:
+    """
+    Id of the user an access token was issued to
+    """
+    token_type, auth_token = Authorization.split(" ")
+    if not auth_token or token_type.lower() != "bearer":
+        raise HTTPException(status_code=401, detail="Account token is missing")
+
+    decoded_token = token.decode_token(auth_token)
+    if decoded_token['iss'] != "access":
+        raise False
+
+    return decoded_token['sub']
+
+def get_user_id(Authorization: str = Header(...)) -> str:
+    """
+    Id of the authenticated user from the access token alone (signature,
+    issuer and expiry), for the endpoints that don't need the user row
     """
     try:
-        rdc = RedisCache()
-        yield rdc
-    finally:
-        pass        
+        return get_token_subject(Authorization)
+
+    except:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
 
 def get_user(Authorization: str = Header(...), db: Session = Depends(get_db)) -> User:
     try:
-        token_type, auth_token = Authorization.split(" ")
-        if not auth_token or token_type.lower() != "bearer":
-            raise HTTPException(status_code=401, detail="Account token is missing")
+        user = crud_user.get_principal(db, get_token_subject(Authorization))
+        if not user:
+            raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
-        decoded_token = token.decode_token(auth_token)
-        if decoded_token['iss'] != "access":
-            raise False
+        return user
 
-        user =  crud_user.get_user_by_id(db, decoded_token['sub'])
+    except:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas")
+
+async def get_user_async(
+    Authorization: str = Header(...), 
+    database: Database = Depends(get_async_db)
+) -> User:
+    """
+    get_user for the async endpoints, the user is not bound to a session
+    """
+    try:
+        user = await crud_user.get_principal_async(database, get_token_subject(Authorization))
         if not user:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
@@ -3,13 +3,14 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm.session import Session
 from starlette.background import BackgroundTasks
-from datetime import datetime
+from datetime import datetime, timezone
 
 from app.api import deps
 from app.utils import date
-from app.crud import crud_appointment, crud_notification
+from app.crud import crud_appointment, crud_notification, crud_schedule
 from app.schemas.appointment import AppointmentCreate, Appointment
 from app.models.user import User
+from app.core.availability import AvailabilityIndex
 from app.core.cache import RedisCache
 
 router = APIRouter()
@@ -32,18 +33,19 @@ def create_appointments(
             detail="Cabeleireiro não encontrado"
         )
 
-    current_date = datetime.now()
-    compare_date = data.date.replace(tzinfo=None)
-    if compare_date < current_date:
+    template = crud_schedule.get_template(db, data.provider_id)
+    date_time = date.to_local(data.date, template.timezone)
+    if date_time < datetime.now(timezone.utc):
         raise HTTPException(
             status_code=400, 
             detail="Você não pode marcar agendamento em datas passadas"
         )
-    
-    if data.date.hour < 8 or data.date.hour > 17:
+
+    cells = template.slot_at(date_time)
+    if cells is None:
         raise HTTPException(
             status_code=400, 
-            detail="Você só pode cria agendamentos entre 8:00 e 17:00"
+            detail="Este horário está fora do expediente do cabeleireiro"
         )
 
     if data.provider_id == user.id:
@@ -52,18 +54,24 @@ def create_appointments(
             detail="Você não pode marca agendamento consigo mesmo"
         )
 
-    validate_date = crud_appointment.get_appointment_by_date(db, data.provider_id, data.date)
-    if validate_date:
+    availability = AvailabilityIndex(rdc)
+    # Fast path only, the unique constraint still decides when the bitmap is not built
+    if availability.is_booked(data.provider_id, date_time, cells):
+        raise HTTPException(status_code=400, detail="Este horario já esta agendado")
+
+    appointment = crud_appointment.create(db, data, user, template)
+    if not appointment:
         raise HTTPException(status_code=400, detail="Este horario já esta agendado")
 
-    appointment = crud_appointment.create(db, data, user)
-    msg = f"Novo agendamento de {user.name} {user.surname} para o {date.format_date(data.date)}"
+    availability.mark_booked(data.provider_id, date_time, cells)
+    msg = f"Novo agendamento de {user.name} {user.surname} para o {date.format_date(date_time, template.timezone)}"
     background_tasks.add_task(crud_notification.create, str(data.provider_id), msg)
-    date_time = data.date
-    rdc.invalidate_cache(
-        f"providers-appointments:{data.provider_id}:{date_time.year}:{date_time.month}:{date_time.day}"
+    rdc.invalidate_cache_tags(
+        f"providers-appointments:{data.provider_id}:{date_time.year}:{date_time.month}:{date_time.day}",
+        f"user-appointments:{user.id}"
     )
-    rdc.invalidate_cache(f"user-appointments:{user.id}")
 
-    return appointment
+    # in the provider timezone, like the listings
+    appointment_out = Appointment.from_orm(appointment)
+    return appointment_out.copy(update={"date": date.to_local(appointment_out.date, template.timezone)})
 
@@ -1,150 +1,320 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends
-from pydantic import parse_obj_as
+from uuid import UUID
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from pydantic import UUID4, parse_obj_as
 from sqlalchemy.orm.session import Session
-from calendar import monthrange
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from starlette.requests import Request
 from starlette.responses import Response
 from starlette import status
 
+from app.core.availability import AvailabilityIndex, next_available_slots
+from app.core.schedule import CELLS_PER_DAY, DAY_CELLS_MASK
+from app.core.config import settings
 from app.core.cache import RedisCache
 from app.models.user import User as UserModel
 from app.api import deps
-from app.crud import crud_user, crud_appointment, crud_notification
+from app.api.caching import cached
+from app.api.limiter import limiter
+from app.utils.pagination import decode_cursor, paginate
+from app.crud import (
+    crud_user, 
+    crud_appointment, 
+    crud_notification, 
+    crud_occupancy, 
+    crud_schedule
+)
 from app.schemas.user import User
 from app.schemas.notification import Notification, ReadNotification
+from app.schemas.page import Page
+from app.schemas.schedule import ProviderSchedule
 from app.schemas.provider import (
     ProviderMonthAvailabilityQuery,
     ProviderDayAvailabilityQuery,
     ProviderDaysAvailability, 
     ProviderHoursAvailability,
+    ProviderBatchAvailability,
+    ProviderSlot,
     ProviderAppointmentsQuery,
     ProviderAppointments
 )
 
 router = APIRouter()
 
-@router.get("", response_model=List[User])
-def list_providers(
-    user: UserModel = Depends(deps.get_user), 
-    db: Session = Depends(deps.get_db),
-    rdc: RedisCache = Depends(deps.get_redis)
+@router.get("", response_model=Page[User])
+@cached(
+    key=lambda cursor, limit, **_: f"providers-list:{cursor or ''}:{limit}",
+    tags=lambda **_: ["providers-list"],
+    # Pages shared by every user, the requesting user is left out per request
+    finalize=lambda page, user, **_: {
+        **page,
+        "items": [provider for provider in page["items"] if provider["id"] != str(user.id)]
+    }
+)
+async def list_providers(
+    cursor: str = Query(None),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    user: UserModel = Depends(deps.get_user_async), 
+    database: Database = Depends(deps.get_async_db)
 ) -> Any:
     """
     Endpoint for list providers
     """
-    cache_key = f"providers-list:{str(user.id)}"
-    providers = rdc.get_from_cache(cache_key)
-    if not providers:
-        providers = crud_user.get_all_providers(db, user)
-        rdc.set_to_cache(cache_key, providers)
-
-    return providers
+    after = decode_cursor(cursor, str, UUID)
+    providers = parse_obj_as(
+        List[User], 
+        await crud_user.get_providers_page_async(database, after, limit + 1)
+    )
+    return jsonable_encoder(
+        paginate(providers, limit, lambda provider: (provider.name, provider.id))
+    )
 
-@router.get("/me", response_model=List[ProviderAppointments])
-def list_self_provider_appointments(
+@router.get("/me", response_model=Page[ProviderAppointments])
+@cached(
+    key=lambda user, query, cursor, limit, **_: (
+        f"providers-appointments:{str(user.id)}:{query.year}:{query.month}:{query.day}"
+        f":{cursor or ''}:{limit}"
+    ),
+    tags=lambda user, query, **_: [
+        f"providers-appointments:{str(user.id)}",
+        f"providers-appointments:{str(user.id)}:{query.year}:{query.month}:{query.day}"
+    ]
+)
+async def list_self_provider_appointments(
     query: ProviderAppointmentsQuery = Depends(),
-    user: UserModel = Depends(deps.get_user), 
-    db: Session = Depends(deps.get_db),
-    rdc: RedisCache = Depends(deps.get_redis),
+    cursor: str = Query(None),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    user: UserModel = Depends(deps.get_user_async), 
+    database: Database = Depends(deps.get_async_db)
 ) -> Any:
     """
     Endpoint for list self provider appointments
     """
-    cache_key = f"providers-appointments:{str(user.id)}:{query.year}:{query.month}:{query.day}"
-    appointments = rdc.get_from_cache(cache_key)
-    if not appointments:
-        appointments = crud_appointment.get_appointments_by_DMY(db, query, user)
-        rdc.set_to_cache(cache_key, parse_obj_as(List[ProviderAppointments], appointments))
-
-    return appointments
+    (after,) = decode_cursor(cursor, datetime.fromisoformat) or (None,)
+    template = await crud_schedule.get_template_async(database, user.id)
+    appointments = await crud_appointment.get_appointments_by_DMY_async(
+        database, query, user, template.timezone, after, limit + 1
+    )
+    return paginate(
+        parse_obj_as(List[ProviderAppointments], appointments), 
+        limit, 
+        lambda appointment: (appointment.date,)
+    )
 
 @router.get(
     "/month-availability", 
-    dependencies=[Depends(deps.get_user)], 
+    dependencies=[Depends(deps.get_user_id)], 
     response_model=List[ProviderDaysAvailability]
 )
+@limiter.limit(settings.RATE_LIMIT_AVAILABILITY)
 def list_provider_days_availability(
+    request: Request,
     query: ProviderMonthAvailabilityQuery = Depends(),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    rdc: RedisCache = Depends(deps.get_redis)
 ) -> Any:
     """
     Endpoint for provider days available in month
     """
-    appointments = crud_appointment.get_appointments_by_MY(db, query)
-    month_days = monthrange(query.year, query.month)[1]
-    days_array = [i for i in range(1, month_days + 1)]
+    # Only the occupancy is indexed, what depends on the current time is computed here
+    booked_by_day = AvailabilityIndex(rdc).get_month(db, query)
+    template = crud_schedule.get_template(db, query.provider_id)
+    days = sorted(booked_by_day)
+    _, free = template.availability(
+        date(query.year, query.month, 1), 
+        [booked_by_day[day] for day in days]
+    )
 
-    availability = []
-    for day in days_array:
-        appointment_in_day = []
-        for appointment in appointments:
-            if appointment.date.day == day:
-                appointment_in_day.append(day)
-        
-        current_date = datetime.utcnow()
-        compare_date = datetime(query.year, query.month, day, 23, 59, 59)
-
-        availability.append({
+    return [
+        {
             'day': day,
-            'available': True if len(appointment_in_day) < 10 and current_date < compare_date else False
-        })
-
-    return availability
+            'available': bool((free >> (i * CELLS_PER_DAY)) & DAY_CELLS_MASK)
+        }
+        for i, day in enumerate(days)
+    ]
 
 @router.get(
     "/day-availability", 
-    dependencies=[Depends(deps.get_user)], 
+    dependencies=[Depends(deps.get_user_id)], 
     response_model=List[ProviderHoursAvailability]
 )
+@limiter.limit(settings.RATE_LIMIT_AVAILABILITY)
 def list_provider_hours_availability(
+    request: Request,
     query: ProviderDayAvailabilityQuery = Depends(),
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    rdc: RedisCache = Depends(deps.get_redis)
 ) -> Any:
     """
     Endpoint for provider times available on the day
     """
-    appointments = crud_appointment.get_appointments_by_DMY(db, query)
-    hours_array = [i for i in range(8, 18)]
- 
+    # Only the occupancy is indexed, what depends on the current time is computed here
+    booked = AvailabilityIndex(rdc).get_day(db, query)
+    template = crud_schedule.get_template(db, query.provider_id)
+    return template.days_availability(date(query.year, query.month, query.day), [booked])[0]
+
+@router.get(
+    "/availability", 
+    dependencies=[Depends(deps.get_user_id)], 
+    response_model=List[ProviderBatchAvailability]
+)
+@limiter.limit(settings.RATE_LIMIT_AVAILABILITY)
+def list_providers_availability(
+    request: Request,
+    provider_ids: List[UUID4] = Query(...),
+    start_date: date = Query(...),
+    end_date: date = Query(...),
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """
+    Endpoint for providers times available on each day of a range
+    """
+    total_days = (end_date - start_date).days + 1
+    if total_days < 1:
+        raise HTTPException(
+            status_code=400, 
+            detail="A data final deve ser igual ou posterior a data inicial"
+        )
+
+    if total_days > settings.AVAILABILITY_BATCH_MAX_DAYS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Você só pode consultar até {settings.AVAILABILITY_BATCH_MAX_DAYS} dias"
+        )
+
+    provider_ids = list(dict.fromkeys(str(provider_id) for provider_id in provider_ids))
+    if len(provider_ids) > settings.AVAILABILITY_BATCH_MAX_PROVIDERS:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Você só pode consultar até {settings.AVAILABILITY_BATCH_MAX_PROVIDERS} cabeleireiros"
+        )
+
+    booked = {
+        (str(row.provider_id), row.day): row.slot_mask
+        for row in crud_occupancy.get_occupancy_by_providers(
+            db, provider_ids, start_date, end_date + timedelta(days=1)
+        )
+    }
+    templates = crud_schedule.get_templates(db, provider_ids)
+    days = [start_date + timedelta(days=i) for i in range(total_days)]
+
     availability = []
-    for hour in hours_array:
-        appointment_in_hour_available = True
-        for appointment in appointments:
-            if appointment.date.hour - 3 == hour:
-                appointment_in_hour_available = False
-                break
-        
-        current_date = datetime.utcnow()
-        compare_date = datetime(query.year, query.month, query.day, hour + 3)
-
-        availability.append({
-            'hour': hour,
-            'available': ( 
-                appointment_in_hour_available if (
-                   ( current_date < compare_date) and 
-                   (compare_date.weekday() < 5)
-                ) 
-                else False
-            )
-        })
+    for provider_id in provider_ids:
+        # All the days of a provider in one pass over its template
+        slots_by_day = templates[provider_id].days_availability(
+            start_date, [booked.get((provider_id, day), 0) for day in days]
+        )
+        availability.extend(
+            {'provider_id': provider_id, 'day': day, 'hours': slots}
+            for day, slots in zip(days, slots_by_day)
+        )
 
     return availability
 
-@router.get("/notifications", response_model=List[Notification])
-def list_provider_notifications(
+@router.get("/next-available", response_model=List[ProviderSlot])
+@limiter.limit(settings.RATE_LIMIT_AVAILABILITY)
+def list_next_available_slots(
+    request: Request,
+    start: datetime = Query(None),
+    limit: int = Query(5, ge=1, le=50),
+    provider_ids: List[UUID4] = Query(None),
+    user: UserModel = Depends(deps.get_user), 
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """
+    Endpoint for the earliest free slots across the providers, the first
+    NEXT_SLOTS_MAX_PROVIDERS ones by name when `provider_ids` is not given
+    """
+    if provider_ids:
+        provider_ids = list(dict.fromkeys(str(provider_id) for provider_id in provider_ids))
+        if len(provider_ids) > settings.NEXT_SLOTS_MAX_PROVIDERS:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"Você só pode consultar até {settings.NEXT_SLOTS_MAX_PROVIDERS} cabeleireiros"
+            )
+
+    providers = crud_user.get_provider_ids(
+        db, user, provider_ids, settings.NEXT_SLOTS_MAX_PROVIDERS
+    )
+
+    return next_available_slots(
+        db, 
+        crud_schedule.get_templates(db, providers), 
+        start or datetime.utcnow(), 
+        limit, 
+        settings.NEXT_SLOTS_HORIZON_DAYS
+    )
+
+@router.get("/schedule", response_model=ProviderSchedule)
+def get_provider_schedule(
     user: UserModel = Depends(deps.get_user),
+    db: Session = Depends(deps.get_db)
+) -> Any:
+    """
+    Endpoint for get self provider schedule
+    """
+    schedule = crud_schedule.get_schedule(db, user.id)
+    return schedule or ProviderSchedule()
+
+@router.put("/schedule", response_model=ProviderSchedule)
+def update_provider_schedule(
+    data: ProviderSchedule,
+    user: UserModel = Depends(deps.get_user),
+    db: Session = Depends(deps.get_db),
+    rdc: RedisCache = Depends(deps.get_redis)
+) -> Any:
+    """
+    Endpoint for update self provider schedule
+    """
+    if not user.address:
+        raise HTTPException(
+            status_code=400, 
+            detail="Somente cabeleireiros podem definir horários de atendimento"
+        )
+
+    previous = crud_schedule.get_template(db, user.id)
+    schedule = crud_schedule.update(db, user, data, commit=False)
+    template = crud_schedule.to_template(schedule)
+    # The occupancy is stored per local day with the slot length of the
+    # schedule, rebuild it in the same transaction when any of them changes
+    rebuild = (
+        template.timezone.zone != previous.timezone.zone or 
+        template.slot_minutes != previous.slot_minutes
+    )
+    if rebuild:
+        crud_occupancy.backfill(db, user.id, commit=False)
+    db.commit()
+
+    # Only drop the cached availability once the new rows are visible
+    if rebuild:
+        AvailabilityIndex(rdc).invalidate_provider(user.id)
+        rdc.invalidate_cache_tags(f"providers-appointments:{str(user.id)}")
+
+    return schedule
+
+@router.get("/notifications", response_model=Page[Notification])
+def list_provider_notifications(
+    cursor: str = Query(None),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    user_id: str = Depends(deps.get_user_id),
 ) -> Any:
     """
     Endpoint for list provider notifications
     """
-    notifications = crud_notification.get_all_notifications(str(user.id))
-    return notifications
+    after = decode_cursor(cursor, datetime.fromisoformat, crud_notification.parse_object_id)
+    notifications = crud_notification.get_notifications_page(user_id, after, limit + 1)
+    return paginate(
+        notifications, 
+        limit, 
+        lambda notification: (notification["created_at"], str(notification["id"]))
+    )
 
 @router.put("/notifications",  responses={204: {"model": None}})
 def update_notification(
     data: ReadNotification,
-    user: UserModel = Depends(deps.get_user),
+    user_id: str = Depends(deps.get_user_id),
 ) -> Any:
     """
     Endpoint for update notification
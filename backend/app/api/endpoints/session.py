@@ -1,12 +1,16 @@
 from typing import Any
+from databases import Database
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.encoders import jsonable_encoder
 from fastapi import BackgroundTasks
+from starlette.requests import Request
 from sqlalchemy.orm.session import Session
 from datetime import datetime, timedelta
 
 from app.schemas.session import SessionLogin, SessionReset, SessionUser, SessionForget
 from app.api import deps
+from app.api.limiter import limiter
+from app.core.config import settings
 from app.core import security
 from app.crud import crud_user
 from app.utils import mail
@@ -14,20 +18,29 @@ from app.utils import mail
 router = APIRouter()
 
 @router.post("/access-token",  response_model=SessionUser)
-def login_access_token(
+@limiter.limit(settings.RATE_LIMIT_LOGIN)
+async def login_access_token(
+    request: Request,
     data: SessionLogin, 
-    db: Session = Depends(deps.get_db)) -> Any:
+    database: Database = Depends(deps.get_async_db)) -> Any:
     """
     Endpoint for access token
     """
-    user = crud_user.get_user_by_email(db, data.email)
+    user = await crud_user.get_user_by_email_async(database, data.email)
     credentials_exception = HTTPException(status_code=400, detail="E-mail ou senha incorretos!")
     if not user:
         raise credentials_exception
 
-    if not security.verify_password(data.password, user.hashed_password):
+    valid, new_hash = await security.verify_and_update_password_async(
+        data.password, user.hashed_password, "login"
+    )
+    if not valid:
         raise credentials_exception
 
+    if new_hash:
+        # BCRYPT_ROUNDS changed since the password was hashed
+        await crud_user.update_password_hash_async(database, user.id, new_hash)
+
     if not user.is_active:
             raise HTTPException(status_code=401, detail="Este e-mail ainda não foi verificado. Verifique sua caixa de entrada")
     
@@ -41,7 +54,9 @@ def login_access_token(
     return session
 
 @router.post("/forgot-password")
+@limiter.limit(settings.RATE_LIMIT_ACCOUNT)
 def request_forgot_password(
+    request: Request,
     data: SessionForget, 
     background_tasks: BackgroundTasks,
     db: Session = Depends(deps.get_db)
@@ -59,18 +74,21 @@ def request_forgot_password(
     return {'detail': 'E-mail de recuperação enviado, por favor verifique sua caixa de entrada'}
 
 @router.post("/reset-password")
-def request_reset_password(
+@limiter.limit(settings.RATE_LIMIT_ACCOUNT)
+async def request_reset_password(
+    request: Request,
     data: SessionReset, 
-    db: Session = Depends(deps.get_db)
+    database: Database = Depends(deps.get_async_db)
 ) -> Any:
     """
     Endpoint for reset password
     """
     user_id = security.verify_token(data.token, 'reset')
-    user = crud_user.get_user_by_id(db, user_id)
+    user = await crud_user.get_user_by_id_async(database, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="Usuário não encontrado!")
 
-    crud_user.update_password(db, user, data.new_password)
+    hashed_password = await security.create_password_hash_async(data.new_password, "password")
+    await crud_user.update_password_hash_async(database, user.id, hashed_password)
     
     return {'detail': 'Senha recuperada com sucesso'}
\ No newline at end of file
@@ -1,18 +1,26 @@
 from typing import Any, List
+from uuid import UUID
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from databases import Database
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from fastapi.encoders import jsonable_encoder
 from pydantic.tools import parse_obj_as
 from sqlalchemy.orm.session import Session
 from starlette.background import BackgroundTasks
+from starlette.requests import Request
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import Response
 from starlette import status
 
 from app.core.cache import RedisCache
+from app.core.config import settings
 from app.models.user import User as UserModel
 from app.api import deps
+from app.api.caching import cached
+from app.api.limiter import limiter
 from app.crud import crud_user, crud_appointment
 from app.utils import media, mail
+from app.utils.pagination import decode_cursor, paginate
 from app.core import security
 from app.schemas.user import (
     User, 
@@ -22,25 +30,28 @@ from app.schemas.user import (
     UserActive,
     UserAppointments,
 )
+from app.schemas.page import Page
 
 router = APIRouter()
 
 @router.post("", status_code=201)
-def create_user(
+@limiter.limit(settings.RATE_LIMIT_ACCOUNT)
+async def create_user(
+    request: Request,
     data: UserCreate,
     background_tasks: BackgroundTasks, 
     db: Session = Depends(deps.get_db),
-    rdc: RedisCache = Depends(deps.get_redis)
+    database: Database = Depends(deps.get_async_db)
 ) -> Any:
     """
     Endpoint for create user
     """
-    user = crud_user.get_user_by_email(db, data.email)
+    user = await crud_user.get_user_by_email_async(database, data.email)
     if user:
         raise HTTPException(status_code=400, detail='Endereço de email já registrador!')
     
-    user = crud_user.create(db, data)
-    rdc.invalidate_cache_prefix("providers-list")
+    hashed_password = await security.create_password_hash_async(data.password, "signup")
+    user = await run_in_threadpool(crud_user.create, db, data, hashed_password)
     token = security.generate_token(str(user.id), "activate", datetime.utcnow() + timedelta(days=31))
     background_tasks.add_task(mail.send_account_activation_email, user.name, user.email, token)
     
@@ -68,15 +79,18 @@ def update_user(
         data.address = user.address
 
     user = crud_user.update(db, user, data)
+    user = crud_user.get_user_with_appointments(db, user.id)
     rdc.invalidate_cache_provider(user)
     if user.address:#<-- if have an address, is a provider
         rdc.invalidate_cache_user(user)
-        rdc.invalidate_cache_prefix("providers-list")
+        rdc.invalidate_cache_tags("providers-list")
 
     return user
 
 @router.put("/file", response_model=User)
+@limiter.limit(settings.RATE_LIMIT_UPLOAD)
 async def upload_avatar(
+    request: Request,
     user: UserModel = Depends(deps.get_user),
     file: UploadFile = File(...), 
     db: Session = Depends(deps.get_db),
@@ -95,32 +109,37 @@ async def upload_avatar(
     user_in = UserUpdate(**jsonable_encoder(user))
     user_in.avatar = avatar
     user = crud_user.update(db, user, user_in)
+    user = crud_user.get_user_with_appointments(db, user.id)
     rdc.invalidate_cache_provider(user)
     if user.address:#<-- if have an address, is a provider
-        rdc.invalidate_cache_prefix("providers-list")
+        rdc.invalidate_cache_tags("providers-list")
         rdc.invalidate_cache_user(user)
 
     return user
 
 @router.put("/password", responses={204: {"model": None}})
-def update_user_password(
+@limiter.limit(settings.RATE_LIMIT_ACCOUNT)
+async def update_user_password(
+    request: Request,
     data: UserUpdatePassword,
-    user: UserModel = Depends(deps.get_user),
-    db: Session = Depends(deps.get_db)
+    user: UserModel = Depends(deps.get_user_async),
+    database: Database = Depends(deps.get_async_db)
 ) -> Any:
     """
     Endpoint for update user password
     """
-    if not security.verify_password(data.old_password, user.hashed_password):
+    if not await security.verify_password_async(data.old_password, user.hashed_password, "password"):
         raise HTTPException(status_code=400, detail='A senha atual esta incorreta')
     
-    crud_user.update_password(db, user, data.new_password)
+    hashed_password = await security.create_password_hash_async(data.new_password, "password")
+    await crud_user.update_password_hash_async(database, user.id, hashed_password)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.put("/activate")
 def request_user_activate(
     data: UserActive, 
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    rdc: RedisCache = Depends(deps.get_redis)
 ) -> Any:
     """
     Endpoint for user activate
@@ -137,24 +156,33 @@ def request_user_activate(
     user_in.is_active = True
     crud_user.update(db, user, user_in)
     if user.address:
+        # an active provider shows up in the directory
+        rdc.invalidate_cache_tags("providers-list")
         return {"type": "provider"}
     
     return {"type": "user"}
 
 
-@router.get("/me", response_model=List[UserAppointments])
-def list_self_provider_appointments(
-    user: UserModel = Depends(deps.get_user), 
-    db: Session = Depends(deps.get_db),
-    rdc: RedisCache = Depends(deps.get_redis),
+@router.get("/me", response_model=Page[UserAppointments])
+@cached(
+    key=lambda user, cursor, limit, **_: f"user-appointments:{str(user.id)}:{cursor or ''}:{limit}",
+    tags=lambda user, **_: [f"user-appointments:{str(user.id)}"]
+)
+async def list_self_provider_appointments(
+    cursor: str = Query(None),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    user: UserModel = Depends(deps.get_user_async), 
+    database: Database = Depends(deps.get_async_db)
 ) -> Any:
     """
     Endpoint for list self user appointments
     """
-    cache_key = f"user-appointments:{str(user.id)}"
-    appointments = rdc.get_from_cache(cache_key)
-    if not appointments:
-        appointments = crud_appointment.get_appointments_by_user(db, user)
-        rdc.set_to_cache(cache_key, parse_obj_as(List[UserAppointments], appointments))
-
-    return appointments
\ No newline at end of file
+    after = decode_cursor(cursor, datetime.fromisoformat, UUID)
+    appointments = await crud_appointment.get_appointments_by_user_async(
+        database, user, after, limit + 1
+    )
+    return paginate(
+        parse_obj_as(List[UserAppointments], appointments), 
+        limit, 
+        lambda appointment: (appointment.date, appointment.id)
+    )
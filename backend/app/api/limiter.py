@@ -0,0 +1,43 @@
+from urllib.parse import quote
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+from starlette.requests import Request
+
+from app.api import deps
+from app.core.config import settings
+
+def rate_limit_key(request: Request) -> str:
+    """
+    Requests are counted per authenticated user, so clients sharing an
+    address (e.g. carrier NAT) don't share a budget. Anonymous requests and
+    invalid tokens are counted per address
+    """
+    authorization = request.headers.get("Authorization")
+    if authorization:
+        try:
+            return f"user:{deps.get_token_subject(authorization)}"
+        except Exception:
+            pass
+
+    return f"ip:{get_remote_address(request)}"
+
+def get_storage_uri() -> str:
+    if settings.REDIS_URL:
+        return settings.REDIS_URL
+
+    credentials = ""
+    if settings.REDIS_PASSWORD:
+        credentials = f"{quote(settings.REDIS_USER or '')}:{quote(settings.REDIS_PASSWORD)}@"
+
+    return f"redis://{credentials}{settings.REDIS_HOST}:{settings.REDIS_PORT}"
+
+# Shared by every worker through redis, the moving window strategy of
+# `limits` checks and records a hit in a single Lua script. Each process
+# falls back to its own counters while redis is unreachable
+limiter = Limiter(
+    key_func=rate_limit_key,
+    default_limits=[settings.RATE_LIMIT_DEFAULT],
+    storage_uri=get_storage_uri(),
+    strategy="moving-window",
+    in_memory_fallback_enabled=True
+)
@@ -1,7 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from starlette.responses import Response
 from starlette import status
 
+from app.api import deps
+from app.core.cache import get_redis_pool
 from .endpoints import appointment, session, user, provider
 
 api_routers = APIRouter()
@@ -13,6 +15,17 @@ def call_api_server():
     """
     return Response(status_code=status.HTTP_200_OK)
 
+@api_routers.get(
+    '/api/metrics/redis-pool', 
+    dependencies=[Depends(deps.verify_metrics_token)], 
+    include_in_schema=False
+)
+def redis_pool_metrics():
+    """
+    Endpoint for redis connection pool checkouts and waits, internal only
+    """
+    return get_redis_pool().metrics()
+
 api_routers.include_router(appointment.router, prefix="/appointments", tags=["appointments"])
 api_routers.include_router(user.router, prefix="/users", tags=["users"])
 api_routers.include_router(session.router, prefix="/sessions", tags=["sessions"])
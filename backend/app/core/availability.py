@@ -0,0 +1,199 @@
+import heapq
+from calendar import monthrange
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.core.schedule import CELLS_PER_DAY, SlotTemplate, iter_cells
+from app.crud import crud_occupancy
+from app.utils.date import to_local
+from app.schemas.provider import ProviderMonthAvailabilityQuery, ProviderDayAvailabilityQuery
+
+AVAILABILITY_PREFIX = "availability-cells"
+# Set of the bitmap keys of a provider, so they can be dropped without a SCAN
+AVAILABILITY_KEYS_PREFIX = "availability-keys"
+AVAILABILITY_TTL = timedelta(days=7)
+# Bits 0-47 are the cells of the day (see app.core.schedule), this one tells
+# the bitmap was rebuilt from postgres and holds every appointment of the day
+BUILT_BIT = 63
+
+def next_available_slots(
+    db: Session,
+    templates: Dict[str, SlotTemplate],
+    start: datetime,
+    limit: int,
+    horizon_days: int
+) -> List[Dict[str, Any]]:
+    """
+    Earliest free slots of the providers from `start` on.\n
+    The occupancy rollup of every provider is read at once (one indexed read
+    of at most providers x days small rows), each template yields its free
+    slots in order and the providers are merged until `limit` slots are found
+    """
+    # a provider local day is at most one day away from the UTC one
+    first_day = to_local(start, timezone.utc).date() - timedelta(days=1)
+    masks = {
+        (str(row.provider_id), row.day): row.slot_mask
+        for row in crud_occupancy.get_occupancy_by_providers(
+            db, list(templates), first_day, first_day + timedelta(days=horizon_days + 2)
+        )
+    }
+    now = max(to_local(start, timezone.utc), datetime.now(timezone.utc))
+
+    providers_slots = []
+    for provider_id, template in templates.items():
+        local_day = to_local(start, template.timezone).date()
+        booked = [
+            masks.get((provider_id, local_day + timedelta(days=i)), 0) 
+            for i in range(horizon_days)
+        ]
+        slots = islice(template.free_slots(local_day, booked, now), limit)
+        providers_slots.append((slot, provider_id) for slot in slots)
+
+    return [
+        {'provider_id': provider_id, 'date': slot}
+        for slot, provider_id in islice(heapq.merge(*providers_slots), limit)
+    ]
+
+class AvailabilityIndex:
+    """
+    Occupancy bitmap per provider and local day in redis, one bit per cell.\n
+    Bits are only ever set (by a rebuild or a new appointment), so a rebuild
+    racing with a booking can't lose the booking
+    """
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def day_key(provider_id: Any, year: int, month: int, day: int) -> str:
+        return f"{AVAILABILITY_PREFIX}:{str(provider_id).lower()}:{year}:{month}:{day}"
+
+    @staticmethod
+    def keys_key(provider_id: Any) -> str:
+        return f"{AVAILABILITY_KEYS_PREFIX}:{str(provider_id).lower()}"
+
+    @staticmethod
+    def booked_mask(bitmap: Optional[bytes]) -> Optional[int]:
+        """
+        Cells set in the bitmap, None if it was never rebuilt
+        """
+        if not bitmap or len(bitmap) < 8:
+            return None
+
+        bits = int.from_bytes(bitmap[:8], "big")
+        if not bits & (1 << (63 - BUILT_BIT)):
+            return None
+
+        # redis counts bit offsets from the most significant bit
+        return sum(1 << cell for cell in range(CELLS_PER_DAY) if bits & (1 << (63 - cell)))
+
+    def get_day(self, db: Session, query: ProviderDayAvailabilityQuery) -> int:
+        """
+        Booked cells of the provider local day
+        """
+        key = self.day_key(query.provider_id, query.year, query.month, query.day)
+        mask = self.booked_mask(self.redis.get(key))
+        if mask is None:
+            occupancy = crud_occupancy.get_occupancy_by_DMY(db, query)
+            mask = occupancy.slot_mask if occupancy else 0
+            self._rebuild(query.provider_id, {key: mask})
+
+        return mask
+
+    def get_month(self, db: Session, query: ProviderMonthAvailabilityQuery) -> Dict[int, int]:
+        """
+        Booked cells of every day of the provider local month
+        """
+        days = range(1, monthrange(query.year, query.month)[1] + 1)
+        keys = {
+            day: self.day_key(query.provider_id, query.year, query.month, day) 
+            for day in days
+        }
+        bitmaps = self.redis.mget(list(keys.values()))
+        mask_by_day = {
+            day: self.booked_mask(bitmap) for day, bitmap in zip(days, bitmaps)
+        }
+
+        missing = [day for day, mask in mask_by_day.items() if mask is None]
+        if missing:
+            # At most one small row per day, the appointments are never scanned
+            masks = {
+                row.day.day: row.slot_mask 
+                for row in crud_occupancy.get_occupancy_by_MY(db, query)
+            }
+            for day in missing:
+                mask_by_day[day] = masks.get(day, 0)
+            self._rebuild(
+                query.provider_id, 
+                {keys[day]: mask_by_day[day] for day in missing}
+            )
+
+        return mask_by_day
+
+    def is_booked(self, provider_id: Any, date: datetime, cells: int) -> Optional[bool]:
+        """
+        `date` in the provider local time, None when the day bitmap is not built
+        """
+        key = self.day_key(provider_id, date.year, date.month, date.day)
+        mask = self.booked_mask(self.redis.get(key))
+        if mask is None:
+            return None
+
+        return bool(mask & cells)
+
+    def mark_booked(self, provider_id: Any, date: datetime, cells: int) -> None:
+        """
+        `date` in the provider local time
+        """
+        key = self.day_key(provider_id, date.year, date.month, date.day)
+        pipeline = self.redis.pipeline()
+        for cell in iter_cells(cells):
+            pipeline.setbit(key, cell, 1)
+        pipeline.expire(key, AVAILABILITY_TTL)
+        self._track(pipeline, provider_id, [key])
+        pipeline.execute()
+
+    def invalidate_provider(self, provider_id: Any) -> None:
+        """
+        Drop every bitmap of the provider, they are rebuilt on the next read
+        """
+        self.invalidate_providers([provider_id])
+
+    def invalidate_providers(self, provider_ids: Iterable[Any]) -> None:
+        """
+        Drop every bitmap of the providers, only the keys tracked in their
+        sets are touched, the keyspace is never scanned
+        """
+        sets = [self.keys_key(provider_id) for provider_id in provider_ids]
+        pipeline = self.redis.pipeline()
+        for keys_key in sets:
+            pipeline.smembers(keys_key)
+        members = pipeline.execute()
+
+        pipeline = self.redis.pipeline()
+        for keys_key, keys in zip(sets, members):
+            if keys:
+                # only what was read, a key tracked meanwhile stays in the set
+                pipeline.unlink(*keys)
+                pipeline.srem(keys_key, *keys)
+        pipeline.execute()
+
+    def _rebuild(self, provider_id: Any, mask_by_key: Dict[str, int]) -> None:
+        pipeline = self.redis.pipeline()
+        for key, mask in mask_by_key.items():
+            for cell in iter_cells(mask):
+                pipeline.setbit(key, cell, 1)
+            pipeline.setbit(key, BUILT_BIT, 1)
+            pipeline.expire(key, AVAILABILITY_TTL)
+        self._track(pipeline, provider_id, list(mask_by_key))
+        pipeline.execute()
+
+    def _track(self, pipeline: Any, provider_id: Any, keys: List[str]) -> None:
+        """
+        The set outlives its bitmaps, members of expired ones are harmless
+        """
+        keys_key = self.keys_key(provider_id)
+        pipeline.sadd(keys_key, *keys)
+        pipeline.expire(keys_key, AVAILABILITY_TTL)
@@ -1,52 +1,442 @@
 from app.schemas.appointment import Appointment
-import pickle
-from redis import Redis
-from typing import Any
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from threading import Lock
+from redis import Redis, BlockingConnectionPool
+from redis.client import PubSubWorkerThread
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from datetime import timedelta
+from starlette.concurrency import run_in_threadpool
 
 from app.models.user import User as UserModel
+from app.schemas.user import User, UserAppointments
+from app.schemas.provider import ProviderAppointments
+from app.schemas.page import Page
 from .config import settings
+from .serializer import Serializer, serializers, schema_version
+
+CACHE_TTL = timedelta(seconds=3600)
+# Longest TTL an entry registered under a tag may have
+TAG_TTL = timedelta(days=1)
+TAG_PREFIX = "cache-tag"
+# Entries dropped per round trip when invalidating a tag, so a large tag
+# never blocks redis for long
+INVALIDATE_BATCH = 500
+LOCK_PREFIX = "cache-lock"
+INVALIDATION_CHANNEL = "cache-invalidation"
+PRINCIPAL_CHANNEL = "principal-invalidation"
+# Response models of the cached endpoints (see app.api.caching.cached),
+# add the model of every new cached endpoint here
+CACHED_MODELS = (Page[User], Page[UserAppointments], Page[ProviderAppointments])
+# Entries written with other schemas (e.g. by the previous deploy) are never read
+CACHE_SCHEMA_VERSION = schema_version(*CACHED_MODELS)
+
+# Only delete the lock if it is still owned by the caller
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class InstrumentedConnectionPool(BlockingConnectionPool):
+    """
+    Blocking pool that counts connection checkouts and the checkouts
+    that had to wait for a connection to be released
+    """
+    def __init__(self, *args, **kwargs):
+        self._metrics_lock = Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        super().__init__(*args, **kwargs)
+
+    def get_connection(self, command_name, *keys, **options):
+        # The queue is pre-filled with placeholders, it is only
+        # empty when every connection is checked out
+        waited = self.pool.empty()
+        start = time.perf_counter()
+        connection = super().get_connection(command_name, *keys, **options)
+        elapsed = time.perf_counter() - start
+        with self._metrics_lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += elapsed
+
+        return connection
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            return {
+                "max_connections": self.max_connections,
+                "created_connections": len(self._connections),
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "wait_seconds": self.wait_seconds,
+            }
+
+def create_redis_pool(redis_url: Optional[str] = settings.REDIS_URL) -> InstrumentedConnectionPool:
+    options = {
+        "max_connections": settings.REDIS_POOL_SIZE,
+        "timeout": settings.REDIS_POOL_TIMEOUT,
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": settings.REDIS_HEALTH_CHECK_INTERVAL,
+    }
+    if redis_url:
+        # Handles redis:// and rediss:// (TLS), credentials and database
+        return InstrumentedConnectionPool.from_url(redis_url, **options)
+
+    return InstrumentedConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        password=settings.REDIS_PASSWORD,
+        username=settings.REDIS_USER,
+        **options
+    )
+
+_redis_pool: Optional[InstrumentedConnectionPool] = None
+_redis_pool_lock = Lock()
+
+def get_redis_pool() -> InstrumentedConnectionPool:
+    """
+    Process-wide pool shared by every RedisCache
+    """
+    global _redis_pool
+    if _redis_pool is None:
+        with _redis_pool_lock:
+            if _redis_pool is None:
+                _redis_pool = create_redis_pool()
+
+    return _redis_pool
+
+class LocalCache:
+    """
+    Bounded in-process LRU with a TTL per entry
+    """
+    def __init__(self, max_size: int, ttl: float, prefixes: Iterable[str] = ()):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.prefixes = tuple(prefixes)
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = Lock()
+
+    def accepts(self, key: str) -> bool:
+        return not self.prefixes or key.startswith(self.prefixes)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+
+            expire_at, value = item
+            if expire_at < time.monotonic():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def evict(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+default_local_cache: Optional[LocalCache] = None
+if settings.LOCAL_CACHE_ENABLED:
+    default_local_cache = LocalCache(
+        settings.LOCAL_CACHE_MAX_SIZE,
+        settings.LOCAL_CACHE_TTL,
+        settings.LOCAL_CACHE_PREFIXES
+    )
+
+# Column values of the authenticated users by id, see crud_user.get_principal
+principal_cache: Optional[LocalCache] = None
+if settings.PRINCIPAL_CACHE_ENABLED:
+    principal_cache = LocalCache(
+        settings.PRINCIPAL_CACHE_MAX_SIZE,
+        settings.PRINCIPAL_CACHE_TTL
+    )
+
+def invalidate_principal(user_id: Any) -> None:
+    """
+    Evict a changed user from the principal cache of every worker
+    """
+    if principal_cache is None:
+        return
+
+    principal_cache.evict(str(user_id))
+    Redis(connection_pool=get_redis_pool()).publish(PRINCIPAL_CHANNEL, str(user_id))
+
+def handle_invalidation_message(message: Dict[str, Any]) -> None:
+    if default_local_cache is not None:
+        default_local_cache.evict(*json.loads(message["data"]))
+
+def handle_principal_message(message: Dict[str, Any]) -> None:
+    if principal_cache is not None:
+        data = message["data"]
+        principal_cache.evict(data.decode() if isinstance(data, bytes) else data)
+
+def start_invalidation_listener() -> Optional[PubSubWorkerThread]:
+    """
+    Evict local copies when any worker invalidates a key or changes a user
+    """
+    handlers = {}
+    if default_local_cache is not None:
+        handlers[INVALIDATION_CHANNEL] = handle_invalidation_message
+    if principal_cache is not None:
+        handlers[PRINCIPAL_CHANNEL] = handle_principal_message
+    if not handlers:
+        return None
+
+    pubsub = Redis(connection_pool=get_redis_pool()).pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**handlers)
+    return pubsub.run_in_thread(sleep_time=1, daemon=True)
+
 class RedisCache(Redis):
-    def __init__(self):
-        if(settings.REDIS_URL):
-            temp = settings.REDIS_URL.split(':')
-            port = temp[-1]
-            temp = temp[2].split('@')
-            password = temp[0]
-            host = temp[1]
-            super().__init__(
-                host=host,
-                port=port,
-                password=password,
-                username=""
-            )
-        else:
-            super().__init__(
-                host=settings.REDIS_HOST,
-                port=settings.REDIS_PORT,
-                password=settings.REDIS_PASSWORD,
-                username=settings.REDIS_USER
-            )
+    def __init__(
+        self, 
+        connection_pool: Optional[InstrumentedConnectionPool] = None,
+        local_cache: Optional[LocalCache] = None,
+        serializer: Optional[Serializer] = None
+    ):
+        super().__init__(connection_pool=connection_pool or get_redis_pool())
+        if local_cache is None:
+            local_cache = default_local_cache
+        self.local_cache = local_cache
+        self.serializer = serializer or serializers[settings.CACHE_SERIALIZER]
+        self.namespace = f"{self.serializer.name}:{CACHE_SCHEMA_VERSION}"
+
+    def cache_key(self, key: str) -> str:
+        """
+        Redis key of a cache entry, namespaced by serializer and schema version
+        """
+        return f"{self.namespace}:{key}"
     
-    def set_to_cache(self, key: str, value: Any) -> None:
-        self.setex(key, timedelta(seconds=3600), value=pickle.dumps(value))
+    def set_to_cache(
+        self, 
+        key: str, 
+        value: Any, 
+        tags: Optional[List[str]] = None, 
+        ttl: timedelta = CACHE_TTL
+    ) -> None:
+        """
+        Store the value and register the key in the index of each tag.\n
+        Tag indexes are sorted sets scored by the entry expiry time, so
+        members whose entry already expired are pruned on every write
+        """
+        cache_key = self.cache_key(key)
+        now = time.time()
+        expire_at = now + ttl.total_seconds()
+        pipeline = self.pipeline()
+        pipeline.setex(cache_key, ttl, value=self.serializer.dumps(value))
+        for tag in tags or []:
+            tag_key = f"{TAG_PREFIX}:{tag}"
+            pipeline.zremrangebyscore(tag_key, "-inf", now)
+            pipeline.zadd(tag_key, {cache_key: expire_at})
+            pipeline.expire(tag_key, TAG_TTL)
+        pipeline.execute()
+        if self._use_local(key):
+            self.local_cache.set(cache_key, value)
     
     def get_from_cache(self, key: str) -> Any:
-        data = self.get(key)
+        cache_key = self.cache_key(key)
+        use_local = self._use_local(key)
+        if use_local:
+            value = self.local_cache.get(cache_key)
+            if value is not None:
+                return value
+
+        data = self.get(cache_key)
         if not data:
             return None
 
-        return pickle.loads(data)
+        value = self.serializer.loads(data)
+        if use_local:
+            self.local_cache.set(cache_key, value)
+        return value
+    
+    def get_or_set(
+        self, 
+        key: str, 
+        compute: Callable[[], Any], 
+        tags: Optional[List[str]] = None,
+        beta: float = settings.CACHE_EARLY_REFRESH_BETA,
+        ttl: timedelta = CACHE_TTL
+    ) -> Any:
+        """
+        Read through cache with stampede protection.\n
+        On a miss a short redis lock lets a single request run `compute`,
+        the others wait for its result. Before the entry expires it may be
+        refreshed early (probabilistic early expiration, beta=0 disables it),
+        while the refresh runs the other requests keep the current value.\n
+        Entries are stored as {"v": value, "d": compute seconds, "e": expire at},
+        so keys written here must only be read through get_or_set. The envelope
+        also means empty results (None, []) are cached like any other value
+        """
+        entry = self.get_from_cache(key)
+        if entry is not None:
+            if not self._should_refresh(entry, beta):
+                return entry["v"]
+
+            token = self._acquire_lock(key)
+            if not token:
+                return entry["v"]
+            try:
+                return self._recompute(key, compute, tags, ttl)
+            finally:
+                self._release_lock(key, token)
+
+        token = self._acquire_lock(key)
+        if token:
+            try:
+                return self._recompute(key, compute, tags, ttl)
+            finally:
+                self._release_lock(key, token)
+
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            entry = self.get_from_cache(key)
+            if entry is not None:
+                return entry["v"]
+
+        # The lock owner is too slow (or died), don't keep the request waiting
+        return compute()
+
+    async def get_or_set_async(
+        self, 
+        key: str, 
+        compute: Callable[[], Awaitable[Any]], 
+        tags: Optional[List[str]] = None,
+        beta: float = settings.CACHE_EARLY_REFRESH_BETA,
+        ttl: timedelta = CACHE_TTL
+    ) -> Any:
+        """
+        get_or_set for the async endpoints, `compute` is awaited on the event
+        loop and the (blocking) redis calls run in the threadpool
+        """
+        entry = await run_in_threadpool(self.get_from_cache, key)
+        if entry is not None:
+            if not self._should_refresh(entry, beta):
+                return entry["v"]
+
+            token = await run_in_threadpool(self._acquire_lock, key)
+            if not token:
+                return entry["v"]
+            try:
+                return await self._recompute_async(key, compute, tags, ttl)
+            finally:
+                await run_in_threadpool(self._release_lock, key, token)
+
+        token = await run_in_threadpool(self._acquire_lock, key)
+        if token:
+            try:
+                return await self._recompute_async(key, compute, tags, ttl)
+            finally:
+                await run_in_threadpool(self._release_lock, key, token)
+
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL)
+            entry = await run_in_threadpool(self.get_from_cache, key)
+            if entry is not None:
+                return entry["v"]
+
+        return await compute()
+
+    def _recompute(
+        self, 
+        key: str, 
+        compute: Callable[[], Any], 
+        tags: Optional[List[str]], 
+        ttl: timedelta
+    ) -> Any:
+        start = time.monotonic()
+        value = compute()
+        delta = time.monotonic() - start
+        expire_at = time.time() + ttl.total_seconds()
+        self.set_to_cache(key, {"v": value, "d": delta, "e": expire_at}, tags=tags, ttl=ttl)
+        return value
+
+    async def _recompute_async(
+        self, 
+        key: str, 
+        compute: Callable[[], Awaitable[Any]], 
+        tags: Optional[List[str]], 
+        ttl: timedelta
+    ) -> Any:
+        start = time.monotonic()
+        value = await compute()
+        delta = time.monotonic() - start
+        expire_at = time.time() + ttl.total_seconds()
+        await run_in_threadpool(
+            self.set_to_cache, key, {"v": value, "d": delta, "e": expire_at}, tags=tags, ttl=ttl
+        )
+        return value
+
+    def _should_refresh(self, entry: Dict[str, Any], beta: float) -> bool:
+        if beta <= 0:
+            return False
+
+        # 1 - random() is in (0, 1], log() is never called with 0
+        gap = -entry["d"] * beta * math.log(1 - random.random())
+        return time.time() + gap >= entry["e"]
+
+    def _acquire_lock(self, key: str) -> Optional[str]:
+        token = uuid.uuid4().hex
+        lock_ttl = int(settings.CACHE_LOCK_TTL * 1000)
+        if self.set(f"{LOCK_PREFIX}:{self.cache_key(key)}", token, nx=True, px=lock_ttl):
+            return token
+
+        return None
+
+    def _release_lock(self, key: str, token: str) -> None:
+        self.eval(RELEASE_LOCK_SCRIPT, 1, f"{LOCK_PREFIX}:{self.cache_key(key)}", token)
     
     def invalidate_cache(self, key: str) -> None:
-        self.delete(key)
+        cache_key = self.cache_key(key)
+        self.delete(cache_key)
+        self._evict_local([cache_key])
     
-    def invalidate_cache_prefix(self, prefix: str) -> None:
-        keys = self.keys(f"{prefix}:*")
-        pipeline = self.pipeline()
-        for key in keys:
-            pipeline.delete(key)
-        pipeline.execute()
+    def invalidate_cache_tags(self, *tags: str) -> None:
+        """
+        Delete every entry registered under the given tags.\n
+        Members are read and unlinked INVALIDATE_BATCH at a time and only the
+        members read are removed from the index, so an entry registered
+        meanwhile is never left out of it
+        """
+        for tag in tags:
+            tag_key = f"{TAG_PREFIX}:{tag}"
+            while True:
+                keys = self.zrange(tag_key, 0, INVALIDATE_BATCH - 1)
+                if not keys:
+                    break
+
+                pipeline = self.pipeline(transaction=False)
+                pipeline.unlink(*keys)
+                pipeline.zrem(tag_key, *keys)
+                pipeline.execute()
+                self._evict_local(keys)
+                if len(keys) < INVALIDATE_BATCH:
+                    break
     
     def invalidate_cache_provider(self, user: UserModel) -> None:
         """
@@ -54,10 +444,10 @@ class RedisCache(Redis):
         through the relationship between user and appointment
         """
         appointment: Appointment
-        for appointment in user.user_appointments:
-            prefix = f"providers-appointments:{appointment.provider_id}"
-            if self.keys(f"{prefix}:*"):
-                self.invalidate_cache_prefix(prefix)
+        provider_ids = {appointment.provider_id for appointment in user.user_appointments}
+        self.invalidate_cache_tags(
+            *[f"providers-appointments:{provider_id}" for provider_id in provider_ids]
+        )
 
     def invalidate_cache_user(self, provider: UserModel) -> None:
         """
@@ -65,6 +455,22 @@ class RedisCache(Redis):
         through the relationship between user/provider and appointment
         """
         appointment: Appointment
-        for appointment in provider.provider_appointments:
-            prefix = f"user-appointments:{appointment.user_id}"
-            self.delete(prefix)
+        user_ids = {appointment.user_id for appointment in provider.provider_appointments}
+        self.invalidate_cache_tags(
+            *[f"user-appointments:{user_id}" for user_id in user_ids]
+        )
+
+    def _use_local(self, key: str) -> bool:
+        return self.local_cache is not None and self.local_cache.accepts(key)
+
+    def _evict_local(self, keys: List[Union[str, bytes]]) -> None:
+        """
+        Evict the (namespaced) keys from this worker and broadcast it to the others
+        """
+        if self.local_cache is None or not keys:
+            return
+
+        keys = [key.decode() if isinstance(key, bytes) else key for key in keys]
+        self.local_cache.evict(*keys)
+        self.publish(INVALIDATION_CHANNEL, json.dumps(keys))
+
@@ -36,6 +36,10 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB')}",
         )
 
+    # asyncpg pool of the async endpoints, see app.db.session.database
+    ASYNC_DB_POOL_MIN_SIZE: int = 5
+    ASYNC_DB_POOL_MAX_SIZE: int = 20
+
     MONGO_DB_URI: str = None
     MONGO_HOST: str = "mongo"
     MONGO_PORT: int = 27017
@@ -46,6 +50,66 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: str = None
     REDIS_USER: str = None
+    REDIS_POOL_SIZE: int = 50
+    REDIS_POOL_TIMEOUT: float = 5
+    REDIS_SOCKET_TIMEOUT: float = 5
+    REDIS_SOCKET_CONNECT_TIMEOUT: float = 5
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30
+    # Token the internal metrics endpoints expect in X-Metrics-Token, they
+    # are not served at all while it is unset
+    METRICS_TOKEN: str = None
+
+    # "orjson" or "pickle", see app.core.serializer
+    CACHE_SERIALIZER: str = "orjson"
+
+    # Stampede protection, see RedisCache.get_or_set
+    CACHE_LOCK_TTL: float = 10
+    CACHE_LOCK_WAIT: float = 2
+    CACHE_LOCK_POLL_INTERVAL: float = 0.05
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+
+    # Optional in-process tier in front of redis, kept in sync between
+    # workers through redis pub/sub
+    LOCAL_CACHE_ENABLED: bool = False
+    LOCAL_CACHE_MAX_SIZE: int = 1024
+    LOCAL_CACHE_TTL: float = 10
+    LOCAL_CACHE_PREFIXES: List[str] = ["providers-list", "providers-appointments"]
+
+    # In-process cache of the authenticated users (deps.get_user), keyed by
+    # the token subject and evicted on every worker through redis pub/sub
+    PRINCIPAL_CACHE_ENABLED: bool = True
+    PRINCIPAL_CACHE_MAX_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: float = 30
+
+    # Keyset pagination of the listings
+    PAGE_SIZE: int = 20
+    MAX_PAGE_SIZE: int = 100
+
+    # Limits of /providers/availability, one request covers providers x days
+    AVAILABILITY_BATCH_MAX_PROVIDERS: int = 50
+    AVAILABILITY_BATCH_MAX_DAYS: int = 31
+    # How many days ahead /providers/next-available looks for free slots
+    NEXT_SLOTS_HORIZON_DAYS: int = 14
+    # and across how many providers at most
+    NEXT_SLOTS_MAX_PROVIDERS: int = 50
+
+    # Requests per client (the authenticated user or the address) in a
+    # moving window kept in redis, see app.api.limiter
+    RATE_LIMIT_DEFAULT: str = "50/minute"
+    # Cheap reads polled by the apps
+    RATE_LIMIT_AVAILABILITY: str = "300/minute"
+    # bcrypt, e-mails and uploads
+    RATE_LIMIT_LOGIN: str = "20/minute"
+    RATE_LIMIT_ACCOUNT: str = "10/minute"
+    RATE_LIMIT_UPLOAD: str = "10/minute"
+
+    # bcrypt cost factor, hashes with another cost are rehashed on login
+    BCRYPT_ROUNDS: int = 12
+    # Processes hashing and verifying passwords, see app.core.security
+    PASSWORD_HASH_WORKERS: int = 2
+    # Password hashes in flight per endpoint, a login storm can't hold the
+    # whole pool while signups and password changes wait
+    PASSWORD_HASH_LIMITS: Dict[str, int] = {"login": 4, "signup": 2, "password": 2}
 
     SMTP_TLS: bool = True
     SMTP_PORT: int
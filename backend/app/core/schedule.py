@@ -0,0 +1,191 @@
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from babel.dates import get_timezone
+
+from app.utils.date import to_local
+
+# Occupancy is stored on a grid of 30 minutes cells per local day, both in
+# provider_day_occupancy.slot_mask and in the redis bitmaps
+CELL_MINUTES = 30
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+DAY_CELLS_MASK = (1 << CELLS_PER_DAY) - 1
+
+DEFAULT_TIMEZONE = "America/Sao_Paulo"
+DEFAULT_SLOT_MINUTES = 60
+DEFAULT_OPENING = 8 * 60
+DEFAULT_CLOSING = 18 * 60
+# Monday to Friday, bit `date.weekday()` set for every working day
+DEFAULT_WORKING_DAYS = 0b0011111
+
+def iter_cells(grid: int) -> Iterator[int]:
+    """
+    Indexes of the bits set in `grid`, lowest first
+    """
+    while grid:
+        low = grid & -grid
+        yield low.bit_length() - 1
+        grid ^= low
+
+class SlotTemplate:
+    """
+    A provider schedule compiled to the cell grid.\n
+    `starts` has the bit of every cell a slot begins at, each slot covers
+    `slot_cells` consecutive cells
+    """
+    def __init__(
+        self,
+        timezone: str,
+        slot_minutes: int,
+        opening: int,
+        closing: int,
+        breaks: Sequence[Tuple[int, int]],
+        working_days: int
+    ):
+        self.timezone = get_timezone(timezone)
+        self.slot_minutes = slot_minutes
+        self.slot_cells = -(-slot_minutes // CELL_MINUTES)
+        self.working_days = working_days
+        self.starts = 0
+
+        minute = opening
+        while minute + slot_minutes <= closing:
+            end = minute + slot_minutes
+            overlap = [stop for start, stop in breaks if start < end and minute < stop]
+            if overlap:
+                minute = max(overlap)
+                continue
+            self.starts |= 1 << (minute // CELL_MINUTES)
+            minute = end
+
+    def slot_mask(self, minute: int) -> int:
+        """
+        Cells taken by an appointment starting `minute` minutes after the local midnight
+        """
+        first = minute // CELL_MINUTES
+        last = min((minute + self.slot_minutes - 1) // CELL_MINUTES, CELLS_PER_DAY - 1)
+
+        return ((1 << (last - first + 1)) - 1) << first
+
+    def slot_at(self, date: datetime) -> Optional[int]:
+        """
+        Cells of the slot starting at `date` (in the template timezone),
+        None when no slot starts there
+        """
+        if date.minute % CELL_MINUTES or date.second or date.microsecond:
+            return None
+
+        minute = date.hour * 60 + date.minute
+        if not self.starts & (1 << (minute // CELL_MINUTES)):
+            return None
+
+        if not self.working_days & (1 << date.weekday()):
+            return None
+
+        return self.slot_mask(minute)
+
+    def localize(self, day: date, cell: int) -> datetime:
+        start = datetime.combine(day, time()) + timedelta(minutes=cell * CELL_MINUTES)
+        return self.timezone.localize(start)
+
+    def availability(
+        self,
+        first_day: date,
+        booked: Sequence[int],
+        now: datetime = None
+    ) -> Tuple[int, int]:
+        """
+        Slots and free slots of len(booked) consecutive days, as bit grids of
+        CELLS_PER_DAY bits per day (day i starts at bit i * CELLS_PER_DAY).\n
+        `booked` holds the occupancy mask of every day, free slots are the
+        ones on working days, not started before `now` and with no booked cell
+        """
+        now = to_local(now or datetime.now(timezone.utc), self.timezone)
+
+        slots = 0
+        opened = 0
+        grid = 0
+        for i, mask in enumerate(booked):
+            offset = i * CELLS_PER_DAY
+            slots |= self.starts << offset
+            if self.working_days & (1 << (first_day + timedelta(days=i)).weekday()):
+                opened |= self.starts << offset
+            grid |= mask << offset
+
+        # Every slot of every day at once: a slot is blocked when any of
+        # its cells is booked
+        blocked = 0
+        for shift in range(self.slot_cells):
+            blocked |= grid >> shift
+
+        past_days = (now.date() - first_day).days
+        if past_days >= 0:
+            minutes = now.hour * 60 + now.minute + (1 if now.second or now.microsecond else 0)
+            cutoff = past_days * CELLS_PER_DAY + -(-minutes // CELL_MINUTES)
+            opened &= ~((1 << cutoff) - 1)
+
+        return slots, opened & ~blocked
+
+    def days_availability(
+        self,
+        first_day: date,
+        booked: Sequence[int],
+        now: datetime = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Every slot of each day with its availability
+        """
+        slots, free = self.availability(first_day, booked, now)
+
+        days = []
+        for i in range(len(booked)):
+            offset = i * CELLS_PER_DAY
+            days.append([
+                {
+                    'hour': cell * CELL_MINUTES // 60,
+                    'minute': cell * CELL_MINUTES % 60,
+                    'available': bool(free & (1 << (offset + cell)))
+                }
+                for cell in iter_cells((slots >> offset) & DAY_CELLS_MASK)
+            ])
+
+        return days
+
+    def free_slots(
+        self,
+        first_day: date,
+        booked: Sequence[int],
+        now: datetime = None
+    ) -> Iterator[datetime]:
+        """
+        Start of every free slot, earliest first
+        """
+        _, free = self.availability(first_day, booked, now)
+        for bit in iter_cells(free):
+            day, cell = divmod(bit, CELLS_PER_DAY)
+            yield self.localize(first_day + timedelta(days=day), cell)
+
+@lru_cache(maxsize=1024)
+def compile_template(
+    timezone: str,
+    slot_minutes: int,
+    opening: int,
+    closing: int,
+    breaks: Tuple[int, ...],
+    working_days: int
+) -> SlotTemplate:
+    """
+    Providers sharing a schedule share the compiled template, `breaks` is the
+    flat [start, end, ...] list stored in provider_schedules
+    """
+    pairs = tuple(zip(breaks[::2], breaks[1::2]))
+    return SlotTemplate(timezone, slot_minutes, opening, closing, pairs, working_days)
+
+DEFAULT_TEMPLATE = compile_template(
+    DEFAULT_TIMEZONE,
+    DEFAULT_SLOT_MINUTES,
+    DEFAULT_OPENING,
+    DEFAULT_CLOSING,
+    (),
+    DEFAULT_WORKING_DAYS
+)
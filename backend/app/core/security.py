@@ -1,10 +1,24 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from fastapi.exceptions import HTTPException
 from datetime import datetime
 from passlib.context import CryptContext
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
 
+from app.core.config import settings
 from app.utils import token
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes with another cost than BCRYPT_ROUNDS (lower or higher) need an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"], 
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS
+)
 
 def create_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -12,6 +26,73 @@ def create_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Returns whether the password matches and, when the hash cost is not
+    BCRYPT_ROUNDS, a new hash to store
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+_hash_pool: Optional[ProcessPoolExecutor] = None
+_hash_pool_lock = Lock()
+# Semaphores are bound to a loop, one set per loop
+_hash_limits: "WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+    WeakKeyDictionary()
+)
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """
+    Process-wide pool running bcrypt off the event loop and the threadpool.\n
+    Workers come from a forkserver, forking the app itself would copy the
+    locks held by its threads (redis listener, database pools)
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        with _hash_pool_lock:
+            if _hash_pool is None:
+                _hash_pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("forkserver")
+                )
+
+    return _hash_pool
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown()
+            _hash_pool = None
+
+def get_hash_limit(endpoint: str) -> asyncio.Semaphore:
+    """
+    Concurrency limit of an endpoint (see PASSWORD_HASH_LIMITS), created on
+    the running loop at the first use
+    """
+    limits = _hash_limits.setdefault(asyncio.get_event_loop(), {})
+    if endpoint not in limits:
+        limits[endpoint] = asyncio.Semaphore(settings.PASSWORD_HASH_LIMITS.get(endpoint, 1))
+
+    return limits[endpoint]
+
+async def run_hash(endpoint: str, function: Callable[..., Any], *args: Any) -> Any:
+    async with get_hash_limit(endpoint):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(get_hash_pool(), function, *args)
+
+async def create_password_hash_async(password: str, endpoint: str) -> str:
+    return await run_hash(endpoint, create_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str, endpoint: str) -> bool:
+    return await run_hash(endpoint, verify_password, plain_password, hashed_password)
+
+async def verify_and_update_password_async(
+    plain_password: str, 
+    hashed_password: str, 
+    endpoint: str
+) -> Tuple[bool, Optional[str]]:
+    return await run_hash(endpoint, verify_and_update_password, plain_password, hashed_password)
+
 def generate_token(user_id: str, iss: str, exp: datetime) -> str:
     payload = {
         "sub": user_id,
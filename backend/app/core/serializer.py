@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+import hashlib
+import pickle
+import orjson
+from typing import Any, Dict, Type
+from pydantic import BaseModel
+from pydantic.json import pydantic_encoder
+
+class Serializer(ABC):
+    """
+    Encode and decode values stored by RedisCache
+    """
+    name: str
+
+    @abstractmethod
+    def dumps(self, value: Any) -> bytes:
+        ...
+
+    @abstractmethod
+    def loads(self, data: bytes) -> Any:
+        ...
+
+class PickleSerializer(Serializer):
+    name = "pickle"
+
+    def dumps(self, value: Any) -> bytes:
+        return pickle.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+class OrjsonSerializer(Serializer):
+    """
+    Compact JSON, pydantic models are stored as plain dicts and
+    validated again by the endpoint response model
+    """
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=pydantic_encoder)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+serializers: Dict[str, Serializer] = {
+    PickleSerializer.name: PickleSerializer(),
+    OrjsonSerializer.name: OrjsonSerializer(),
+}
+
+def schema_version(*models: Type[BaseModel]) -> str:
+    """
+    Short hash of the models json schema, changes whenever a cached schema changes
+    """
+    digest = hashlib.sha1()
+    for model in models:
+        digest.update(model.schema_json(sort_keys=True).encode())
+
+    return digest.hexdigest()[:8]
@@ -1,77 +1,195 @@
-from datetime import datetime
-from typing import List
+from babel.dates import get_timezone
+from datetime import datetime, tzinfo
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+from databases import Database
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, extract
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy import and_, func, select, tuple_
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.exc import IntegrityError
 
 from app.models.appointment import Appointment
+from app.models.schedule import ProviderSchedule
 from app.schemas.appointment import AppointmentCreate
 from app.models.user import User
-from app.schemas.provider import (
-    ProviderMonthAvailabilityQuery, 
-    ProviderDayAvailabilityQuery)
+from app.core.schedule import DEFAULT_TIMEZONE, SlotTemplate
+from app.crud import crud_occupancy, crud_schedule
+from app.utils.date import TIMEZONE, day_range, to_local
+from app.schemas.provider import ProviderDayAvailabilityQuery
 
-def create(db: Session, appointment_in: AppointmentCreate, user: User) -> Appointment:
+SLOT_CONSTRAINT = "uq_appointments_provider_id_date"
+# Columns of the schemas.user.User a listed appointment embeds
+USER_COLUMNS = ("id", "name", "surname", "address", "email", "avatar")
+APPOINTMENT_COLUMNS = ("id", "provider_id", "user_id", "date")
+
+def create(
+    db: Session, 
+    appointment_in: AppointmentCreate, 
+    user: User, 
+    template: SlotTemplate = None
+) -> Optional[Appointment]:
+    """
+    Returns None when the provider already has an appointment at this date
+    or one overlapping it.\n
+    The provider daily occupancy is updated in the same transaction, with the
+    cells of a slot of `template` (the provider schedule when not given)
+    """
     appointment_in_data = jsonable_encoder(appointment_in)
     db_appointment = Appointment(**appointment_in_data, user_id=user.id)
 
     db.add(db_appointment)
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if getattr(e.orig.diag, "constraint_name", None) == SLOT_CONSTRAINT:
+            return None
+        raise
+
+    template = template or crud_schedule.get_template(db, appointment_in.provider_id)
+    local_date = to_local(appointment_in.date, template.timezone)
+    cells = template.slot_mask(local_date.hour * 60 + local_date.minute)
+    if not crud_occupancy.increment(db, appointment_in.provider_id, local_date.date(), cells):
+        db.rollback()
+        return None
     db.commit()
     db.refresh(db_appointment)
 
     return db_appointment
 
-def get_appointments_by_user(db: Session, user: User) -> List[Appointment]:
-    date_now = datetime.utcnow()
-    return db.query(Appointment).filter(
-        and_(
-            Appointment.user_id == user.id,
-            Appointment.date >= date_now
-        )
-    ).all()
-
-def get_appointment_by_date(db: Session, provider_id: str ,date: datetime) -> Appointment:
-    return db.query(Appointment).filter(
-        and_(
-            Appointment.provider_id==provider_id,
-            Appointment.date==date
-        )   
-    ).first()
-
-def get_appointments_by_MY(
+def get_appointments_by_user(
     db: Session, 
-    query: ProviderMonthAvailabilityQuery
+    user: User, 
+    after: Optional[Tuple[datetime, UUID]] = None,
+    limit: int = None
 ) -> List[Appointment]:
     """
-    MY - Month and Year
+    Upcoming appointments ordered by (date, id), `after` is the sort key of
+    the last appointment of the previous page
     """
-    return db.query(Appointment).filter(
-        and_(
-            Appointment.provider_id == query.provider_id,
-            extract("month", Appointment.date) == query.month,
-            extract("year", Appointment.date) == query.year,
-        )
-    ).all()
+    # The provider comes in the same statement, with only the columns the
+    # response needs
+    query = db.query(Appointment).options(
+        load_only(*APPOINTMENT_COLUMNS),
+        joinedload(Appointment.provider).load_only(*USER_COLUMNS)
+    ).filter(user_appointments_filter(user, after))
+
+    return query.order_by(Appointment.date, Appointment.id).limit(limit).all()
+
+def user_appointments_filter(
+    user: User, 
+    after: Optional[Tuple[datetime, UUID]] = None
+) -> ColumnElement:
+    criteria = and_(
+        Appointment.user_id == user.id,
+        Appointment.date >= datetime.utcnow()
+    )
+    if after:
+        criteria = and_(criteria, tuple_(Appointment.date, Appointment.id) > tuple_(*after))
+
+    return criteria
 
 def get_appointments_by_DMY(
     db: Session, 
     query: ProviderDayAvailabilityQuery, 
-    user: User = False
+    user: User = False,
+    tz: tzinfo = TIMEZONE,
+    after: Optional[datetime] = None,
+    limit: int = None
 ) -> List[Appointment]:
     """
     DMY - Day and Month and Year\n
-    if user was passed to query by user id
+    if user was passed to query by user id, the day is taken in `tz`.\n
+    Ordered by date (unique per provider), `after` is the date of the last
+    appointment of the previous page
     """
     if user:
         provider_id = user.id
     else:
         provider_id = query.provider_id
 
-    return db.query(Appointment).filter(
-        and_(
-            Appointment.provider_id == provider_id,
-            extract("day", Appointment.date) == query.day,
-            extract("month", Appointment.date) == query.month,
-            extract("year", Appointment.date) == query.year,
+    # The user comes in the same statement, with only the columns the
+    # response needs
+    appointments = db.query(Appointment).options(
+        load_only(*APPOINTMENT_COLUMNS),
+        joinedload(Appointment.user).load_only(*USER_COLUMNS)
+    ).filter(provider_appointments_filter(provider_id, query, tz, after))
+
+    return appointments.order_by(Appointment.date).limit(limit).all()
+
+def provider_appointments_filter(
+    provider_id: Any, 
+    query: ProviderDayAvailabilityQuery, 
+    tz: tzinfo = TIMEZONE,
+    after: Optional[datetime] = None
+) -> ColumnElement:
+    start, end = day_range(query.year, query.month, query.day, tz)
+    criteria = and_(
+        Appointment.provider_id == provider_id,
+        Appointment.date >= start,
+        Appointment.date < end,
+    )
+    if after:
+        criteria = and_(criteria, Appointment.date > after)
+
+    return criteria
+
+# Async versions for the async endpoints, the same statements through
+# app.db.session.database. Appointments come as dicts, with the embedded user
+# under `related` and the date in the provider timezone, ready for the
+# listing schemas
+
+def listing_select(related: str) -> Select:
+    """
+    Appointment columns joined to the `related` ("provider" or "user") columns
+    and to the timezone of the provider schedule
+    """
+    users = User.__table__.alias(related)
+    schedules = ProviderSchedule.__table__
+    foreign_key = Appointment.provider_id if related == "provider" else Appointment.user_id
+    columns = [
+        *[Appointment.__table__.c[column] for column in APPOINTMENT_COLUMNS],
+        *[users.c[column].label(f"{related}_{column}") for column in USER_COLUMNS],
+        func.coalesce(schedules.c.timezone, DEFAULT_TIMEZONE).label("timezone")
+    ]
+
+    return select(columns).select_from(
+        Appointment.__table__.join(users, foreign_key == users.c.id).outerjoin(
+            schedules, schedules.c.provider_id == Appointment.provider_id
         )
-    ).all()
\ No newline at end of file
+    )
+
+def listing_row(row, related: str) -> Dict[str, Any]:
+    appointment = {column: row[column] for column in APPOINTMENT_COLUMNS}
+    appointment["date"] = to_local(row["date"], get_timezone(row["timezone"]))
+    appointment[related] = {column: row[f"{related}_{column}"] for column in USER_COLUMNS}
+    return appointment
+
+async def get_appointments_by_user_async(
+    database: Database, 
+    user: User, 
+    after: Optional[Tuple[datetime, UUID]] = None,
+    limit: int = None
+) -> List[Dict[str, Any]]:
+    query = listing_select("provider").where(
+        user_appointments_filter(user, after)
+    ).order_by(Appointment.date, Appointment.id).limit(limit)
+
+    return [listing_row(row, "provider") for row in await database.fetch_all(query)]
+
+async def get_appointments_by_DMY_async(
+    database: Database, 
+    query: ProviderDayAvailabilityQuery, 
+    user: User = False,
+    tz: tzinfo = TIMEZONE,
+    after: Optional[datetime] = None,
+    limit: int = None
+) -> List[Dict[str, Any]]:
+    provider_id = user.id if user else query.provider_id
+    statement = listing_select("user").where(
+        provider_appointments_filter(provider_id, query, tz, after)
+    ).order_by(Appointment.date).limit(limit)
+
+    return [listing_row(row, "user") for row in await database.fetch_all(statement)]
\ No newline at end of file
@@ -1,7 +1,11 @@
+from bson import ObjectId
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
 from app.models.notification import Notification as ModelNotification
 
+# Fields of schemas.notification.Notification
+NOTIFICATION_FIELDS = ("id", "recipient_id", "content", "read", "created_at")
+
 def create(provider_id: str, msg: str) -> None:
     """
     To do unit test passes test as true 
@@ -13,18 +17,40 @@ def create(provider_id: str, msg: str) -> None:
     object.save()
     return object.id
 
-def get_all_notifications(provider_id: str) -> List[dict]:
-    queryset: ModelNotification = ModelNotification.objects(
-        recipient_id=provider_id,
-        read=False
-    ).all()
+def parse_object_id(value: str) -> ObjectId:
+    if not ObjectId.is_valid(value):
+        raise ValueError(value)
+
+    return ObjectId(value)
 
-    notification = []
-    for q in queryset:
-        value = q.to_mongo().to_dict()
-        value['id'] = value['_id']
-        notification.append(value)
-    return notification
+def get_notifications_page(
+    provider_id: str, 
+    after: Optional[Tuple[datetime, ObjectId]] = None, 
+    limit: int = 20
+) -> List[dict]:
+    """
+    Unread notifications newest first, ordered by (created_at, id) as the
+    recipient_id_read_created_at index. `after` is the sort key of the last
+    notification of the previous page.\n
+    Documents come as raw dicts with only the response fields
+    """
+    query = {"recipient_id": provider_id, "read": False}
+    if after:
+        created_at, doc_id = after
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}}
+        ]
+
+    documents = ModelNotification.objects(__raw__=query).only(
+        *NOTIFICATION_FIELDS
+    ).order_by("-created_at", "-id").limit(limit)
+
+    notifications = []
+    for document in documents.as_pymongo():
+        document["id"] = document.pop("_id")
+        notifications.append(document)
+    return notifications
 
 def update(doc_id: str) -> None:
     """
@@ -33,4 +59,4 @@ def update(doc_id: str) -> None:
     ModelNotification.objects(id=doc_id).update_one(
         read=True, 
         updated_at=datetime.utcnow()
-    )
\ No newline at end of file
+    )
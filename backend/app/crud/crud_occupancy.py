@@ -0,0 +1,147 @@
+from datetime import date
+from typing import Any, List, Sequence
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.occupancy import ProviderDayOccupancy
+from app.core.schedule import (
+    CELL_MINUTES, 
+    CELLS_PER_DAY, 
+    DEFAULT_TIMEZONE, 
+    DEFAULT_SLOT_MINUTES
+)
+from app.schemas.provider import (
+    ProviderMonthAvailabilityQuery, 
+    ProviderDayAvailabilityQuery)
+
+def increment(db: Session, provider_id: Any, day: date, cells: int) -> bool:
+    """
+    Count a new appointment taking `cells` of the provider local day, does not
+    commit so it runs in the caller transaction.\n
+    Returns False (and changes nothing) when any of the cells is already booked
+    """
+    statement = insert(ProviderDayOccupancy).values(
+        provider_id=provider_id,
+        day=day,
+        booked_count=1,
+        slot_mask=cells
+    )
+    result = db.execute(statement.on_conflict_do_update(
+        index_elements=[ProviderDayOccupancy.provider_id, ProviderDayOccupancy.day],
+        set_={
+            "booked_count": ProviderDayOccupancy.booked_count + 1,
+            "slot_mask": ProviderDayOccupancy.slot_mask.op("|")(statement.excluded.slot_mask)
+        },
+        # the conflicting row is locked, so overlapping bookings are serialized here
+        where=ProviderDayOccupancy.slot_mask.op("&")(statement.excluded.slot_mask) == 0
+    ))
+
+    return result.rowcount == 1
+
+def get_occupancy_by_MY(
+    db: Session, 
+    query: ProviderMonthAvailabilityQuery
+) -> List[ProviderDayOccupancy]:
+    """
+    MY - Month and Year\n
+    one row per day with at least one appointment
+    """
+    start = date(query.year, query.month, 1)
+    if query.month == 12:
+        end = date(query.year + 1, 1, 1)
+    else:
+        end = date(query.year, query.month + 1, 1)
+
+    return db.query(ProviderDayOccupancy).filter(
+        and_(
+            ProviderDayOccupancy.provider_id == query.provider_id,
+            ProviderDayOccupancy.day >= start,
+            ProviderDayOccupancy.day < end,
+        )
+    ).all()
+
+def get_occupancy_by_DMY(
+    db: Session, 
+    query: ProviderDayAvailabilityQuery
+) -> ProviderDayOccupancy:
+    """
+    DMY - Day and Month and Year
+    """
+    return db.query(ProviderDayOccupancy).filter_by(
+        provider_id=query.provider_id,
+        day=date(query.year, query.month, query.day)
+    ).first()
+
+def get_occupancy_by_providers(
+    db: Session,
+    provider_ids: Sequence[str],
+    start_day: date,
+    end_day: date
+) -> List[ProviderDayOccupancy]:
+    """
+    Rows of the providers in [start_day, end_day), read from the primary key
+    """
+    return db.query(ProviderDayOccupancy).filter(
+        and_(
+            ProviderDayOccupancy.provider_id.in_(provider_ids),
+            ProviderDayOccupancy.day >= start_day,
+            ProviderDayOccupancy.day < end_day,
+        )
+    ).all()
+
+def get_provider_ids(db: Session) -> List[str]:
+    """
+    Providers with at least one row
+    """
+    rows = db.query(ProviderDayOccupancy.provider_id).distinct().all()
+    return [str(row.provider_id) for row in rows]
+
+def backfill(db: Session, provider_id: Any = None, commit: bool = True) -> int:
+    """
+    Rebuild the rows (of every provider or only of `provider_id`) from the
+    appointments table, returns the number of rows written.\n
+    Each appointment takes the cells of a slot of the provider current schedule,
+    with `commit` False it runs in the caller transaction
+    """
+    if provider_id:
+        # the days themselves change along with the provider timezone
+        db.query(ProviderDayOccupancy).filter_by(provider_id=provider_id).delete()
+
+    result = db.execute(text("""
+        INSERT INTO provider_day_occupancy (provider_id, day, booked_count, slot_mask)
+        SELECT provider_id, day, count(DISTINCT id), bit_or(1::bigint << cell)
+        FROM (
+            SELECT
+                appointments.id,
+                appointments.provider_id,
+                (appointments.date AT TIME ZONE coalesce(schedules.timezone, :timezone))::date AS day,
+                extract(hour FROM appointments.date AT TIME ZONE coalesce(schedules.timezone, :timezone))::int * 60
+                + extract(minute FROM appointments.date AT TIME ZONE coalesce(schedules.timezone, :timezone))::int
+                AS minute,
+                coalesce(schedules.slot_minutes, :slot_minutes) AS slot_minutes
+            FROM appointments
+            LEFT JOIN provider_schedules AS schedules 
+                ON schedules.provider_id = appointments.provider_id
+            WHERE CAST(:provider_id AS uuid) IS NULL 
+                OR appointments.provider_id = CAST(:provider_id AS uuid)
+        ) AS booked
+        CROSS JOIN LATERAL generate_series(
+            minute / :cell_minutes, 
+            least((minute + slot_minutes - 1) / :cell_minutes, :last_cell)
+        ) AS cell
+        GROUP BY provider_id, day
+        ON CONFLICT (provider_id, day) DO UPDATE SET
+            booked_count = excluded.booked_count,
+            slot_mask = excluded.slot_mask
+    """), {
+        "timezone": DEFAULT_TIMEZONE,
+        "slot_minutes": DEFAULT_SLOT_MINUTES,
+        "cell_minutes": CELL_MINUTES,
+        "last_cell": CELLS_PER_DAY - 1,
+        "provider_id": str(provider_id) if provider_id else None,
+    })
+    if commit:
+        db.commit()
+
+    return result.rowcount
@@ -0,0 +1,91 @@
+from typing import Any, Dict, List, Optional, Sequence
+from databases import Database
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+
+from app.core.schedule import SlotTemplate, DEFAULT_TEMPLATE, compile_template
+from app.models.schedule import ProviderSchedule
+from app.models.user import User
+from app.schemas.schedule import ProviderSchedule as ProviderScheduleSchema
+
+def minutes(value) -> int:
+    return value.hour * 60 + value.minute
+
+def get_schedule(db: Session, provider_id: Any) -> Optional[ProviderSchedule]:
+    return db.query(ProviderSchedule).filter_by(provider_id=provider_id).first()
+
+def get_schedules(db: Session, provider_ids: Sequence[Any]) -> List[ProviderSchedule]:
+    return db.query(ProviderSchedule).filter(
+        ProviderSchedule.provider_id.in_(provider_ids)
+    ).all()
+
+def update(
+    db: Session, 
+    provider: User, 
+    schedule_in: ProviderScheduleSchema, 
+    commit: bool = True
+) -> ProviderSchedule:
+    """
+    With `commit` False the upsert runs in the caller transaction
+    """
+    values = {
+        "timezone": schedule_in.timezone,
+        "slot_minutes": schedule_in.slot_minutes,
+        "opening": minutes(schedule_in.opening),
+        "closing": minutes(schedule_in.closing),
+        "breaks": [
+            minute 
+            for item in sorted(schedule_in.breaks, key=lambda item: item.start)
+            for minute in (minutes(item.start), minutes(item.end))
+        ],
+        "working_days": sum(1 << day for day in set(schedule_in.working_days)),
+    }
+    statement = insert(ProviderSchedule).values(provider_id=provider.id, **values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[ProviderSchedule.provider_id],
+        set_=values
+    ))
+    if commit:
+        db.commit()
+
+    return get_schedule(db, provider.id)
+
+def to_template(schedule: Optional[ProviderSchedule]) -> SlotTemplate:
+    """
+    Providers without a schedule keep the default one
+    """
+    if not schedule:
+        return DEFAULT_TEMPLATE
+
+    return compile_template(
+        schedule.timezone,
+        schedule.slot_minutes,
+        schedule.opening,
+        schedule.closing,
+        tuple(schedule.breaks),
+        schedule.working_days
+    )
+
+def get_template(db: Session, provider_id: Any) -> SlotTemplate:
+    return to_template(get_schedule(db, provider_id))
+
+async def get_template_async(database: Database, provider_id: Any) -> SlotTemplate:
+    query = select([ProviderSchedule.__table__]).where(
+        ProviderSchedule.provider_id == provider_id
+    )
+    row = await database.fetch_one(query)
+    return to_template(ProviderSchedule(**dict(row)) if row else None)
+
+def get_templates(db: Session, provider_ids: Sequence[Any]) -> Dict[str, SlotTemplate]:
+    """
+    Templates of many providers with a single query
+    """
+    schedules = {
+        str(schedule.provider_id): schedule 
+        for schedule in get_schedules(db, provider_ids)
+    }
+    return {
+        str(provider_id): to_template(schedules.get(str(provider_id))) 
+        for provider_id in provider_ids
+    }
@@ -1,14 +1,22 @@
-from typing import List
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+from databases import Database
+from sqlalchemy.orm import Session, make_transient_to_detached, selectinload
+from sqlalchemy import and_, select, tuple_
+from sqlalchemy.sql.expression import ColumnElement
 from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.core.security import create_password_hash
+from app.core.cache import invalidate_principal, principal_cache
 
-def create(db: Session, user_in: UserCreate) -> User:
-    hashed_password = create_password_hash(user_in.password)
+def create(db: Session, user_in: UserCreate, hashed_password: str = None) -> User:
+    """
+    The password is hashed here when `hashed_password` is not given
+    """
+    hashed_password = hashed_password or create_password_hash(user_in.password)
     del user_in.password
     del user_in.confirm_password
     user_in_data = jsonable_encoder(user_in)
@@ -22,15 +30,20 @@ def create(db: Session, user_in: UserCreate) -> User:
 def update(db: Session, db_user: User, user_in: UserUpdate) -> User:
     db.query(User).filter_by(id=db_user.id).update(user_in)
     db.commit()
+    invalidate_principal(db_user.id)
     db.refresh(db_user)
 
     return db_user
 
 def update_password(db: Session, db_user: User, password: str) -> None:
+    update_password_hash(db, db_user, create_password_hash(password))
+
+def update_password_hash(db: Session, db_user: User, hashed_password: str) -> None:
     db.query(User).filter_by(id=db_user.id).update({
-        'hashed_password': create_password_hash(password)
+        'hashed_password': hashed_password
     })
     db.commit()
+    invalidate_principal(db_user.id)
     db.refresh(db_user)
     
 def get_user_by_email(db: Session, email: str) -> User:
@@ -39,11 +52,141 @@ def get_user_by_email(db: Session, email: str) -> User:
 def get_user_by_id(db: Session, user_id: str) -> User:
     return db.query(User).filter_by(id = user_id).first()
 
-def get_all_providers(db: Session, user: User) -> List[User]:
-    return db.query(User).filter(
+def column_values(user: User) -> Dict[str, Any]:
+    return {column.key: getattr(user, column.key) for column in User.__table__.columns}
+
+def get_principal(db: Session, user_id: str) -> Optional[User]:
+    """
+    get_user_by_id through the principal cache, for the authentication of
+    every request.\n
+    Only column values are cached, a hit is merged into `db` without a query
+    so the user can be updated and lazy loads still work
+    """
+    if principal_cache is None:
+        return get_user_by_id(db, user_id)
+
+    values = principal_cache.get(user_id)
+    if values is None:
+        user = get_user_by_id(db, user_id)
+        if user:
+            principal_cache.set(user_id, column_values(user))
+        return user
+
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+def get_user_with_appointments(db: Session, user_id: str) -> User:
+    """
+    Load the user together with both appointment collections,
+    for the paths that need to walk them (e.g. cache invalidation)
+    """
+    return db.query(User).options(
+        selectinload(User.provider_appointments),
+        selectinload(User.user_appointments)
+    ).filter_by(id = user_id).first()
+
+def get_all_providers(db: Session, user: User = None) -> List[User]:
+    """
+    if user was passed it is left out of the list
+    """
+    query = db.query(User).filter(
         and_(
-            User.id != user.id,
             User.address != None,
             User.is_active == True
         )
-    ).all()
\ No newline at end of file
+    )
+    if user:
+        query = query.filter(User.id != user.id)
+
+    return query.all()
+
+def get_providers_page(
+    db: Session, 
+    after: Optional[Tuple[str, UUID]] = None, 
+    limit: int = 20
+) -> List[User]:
+    """
+    Active providers ordered by (name, id), `after` is the sort key of the
+    last provider of the previous page
+    """
+    query = db.query(User).filter(providers_page_filter(after))
+    return query.order_by(User.name, User.id).limit(limit).all()
+
+def providers_page_filter(after: Optional[Tuple[str, UUID]] = None) -> ColumnElement:
+    criteria = and_(
+        User.address != None,
+        User.is_active == True
+    )
+    if after:
+        criteria = and_(criteria, tuple_(User.name, User.id) > tuple_(*after))
+
+    return criteria
+
+def get_provider_ids(
+    db: Session, 
+    user: User = None, 
+    provider_ids: Sequence[Any] = None, 
+    limit: int = None
+) -> List[str]:
+    """
+    Ids of the active providers (only of `provider_ids` when given) ordered
+    by (name, id), if user was passed it is left out
+    """
+    query = db.query(User.id).filter(providers_page_filter())
+    if provider_ids:
+        query = query.filter(User.id.in_(provider_ids))
+    if user:
+        query = query.filter(User.id != user.id)
+
+    rows = query.order_by(User.name, User.id).limit(limit).all()
+    return [str(row.id) for row in rows]
+
+# Async versions for the async endpoints, the same statements through
+# app.db.session.database. Users are built from the rows and are not bound to
+# a session, their relationships are not loaded
+
+def to_user(row) -> Optional[User]:
+    return User(**dict(row)) if row else None
+
+async def get_principal_async(database: Database, user_id: str) -> Optional[User]:
+    if principal_cache is None:
+        return await get_user_by_id_async(database, user_id)
+
+    values = principal_cache.get(user_id)
+    if values is None:
+        user = await get_user_by_id_async(database, user_id)
+        if user:
+            principal_cache.set(user_id, column_values(user))
+        return user
+
+    return User(**values)
+
+async def get_user_by_email_async(database: Database, email: str) -> Optional[User]:
+    query = select([User.__table__]).where(User.email == email).limit(1)
+    return to_user(await database.fetch_one(query))
+
+async def get_user_by_id_async(database: Database, user_id: str) -> Optional[User]:
+    query = select([User.__table__]).where(User.id == user_id).limit(1)
+    return to_user(await database.fetch_one(query))
+
+async def update_password_hash_async(
+    database: Database, 
+    user_id: Any, 
+    hashed_password: str
+) -> None:
+    await database.execute(
+        User.__table__.update().where(User.id == user_id).values(hashed_password=hashed_password)
+    )
+    await run_in_threadpool(invalidate_principal, user_id)
+
+async def get_providers_page_async(
+    database: Database, 
+    after: Optional[Tuple[str, UUID]] = None, 
+    limit: int = 20
+) -> List[User]:
+    query = select([User.__table__]).where(
+        providers_page_filter(after)
+    ).order_by(User.name, User.id).limit(limit)
+
+    return [to_user(row) for row in await database.fetch_all(query)]
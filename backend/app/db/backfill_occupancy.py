@@ -0,0 +1,39 @@
+"""
+Rebuild provider_day_occupancy from the appointments table.\n
+Usage: pipenv run backfill-occupancy
+"""
+import logging
+
+from app.core.availability import AvailabilityIndex
+from app.core.cache import RedisCache
+from app.crud import crud_occupancy
+from app.db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Providers whose bitmaps are dropped per redis round trip
+INVALIDATE_BATCH = 500
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        rows = crud_occupancy.backfill(db)
+        provider_ids = crud_occupancy.get_provider_ids(db)
+    finally:
+        db.close()
+
+    # Bitmaps built before the backfill may hold an empty day as rebuilt,
+    # drop them so they are rebuilt from the new rows
+    availability = AvailabilityIndex(RedisCache())
+    for start in range(0, len(provider_ids), INVALIDATE_BATCH):
+        availability.invalidate_providers(provider_ids[start:start + INVALIDATE_BATCH])
+
+    logger.info(
+        "provider_day_occupancy: %s days rebuilt, bitmaps of %s providers dropped", 
+        rows, 
+        len(provider_ids)
+    )
+
+if __name__ == "__main__":
+    main()
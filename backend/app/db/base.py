@@ -2,4 +2,6 @@
 # imported by Alembic
 from app.db.base_class import Base
 from app.models.appointment import Appointment
-from app.models.user import User 
\ No newline at end of file
+from app.models.user import User 
+from app.models.occupancy import ProviderDayOccupancy
+from app.models.schedule import ProviderSchedule
@@ -1,3 +1,5 @@
+from copy import copy
+from databases import Database
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy_utils import database_exists, create_database
@@ -12,4 +14,15 @@ else:
 if settings.DEBUG and not database_exists(engine.url):
     create_database(engine.url)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+# Same database through asyncpg, for the async endpoints. SQLAlchemy 1.3 has
+# no asyncio support, `databases` runs Core statements built from the models
+# and is connected on the app startup
+async_url = copy(engine.url)
+async_url.drivername = "postgresql"
+database = Database(
+    str(async_url),
+    min_size=settings.ASYNC_DB_POOL_MIN_SIZE,
+    max_size=settings.ASYNC_DB_POOL_MAX_SIZE
+)
@@ -4,16 +4,18 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from mongoengine.connection import connect
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
+from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from app.core.config import settings
+from app.core.cache import get_redis_pool, start_invalidation_listener
+from app.core.security import get_hash_pool, shutdown_hash_pool
+from app.db.session import database
+from app.api.limiter import limiter
 from app.api.routers import api_routers
 
 
-limiter = Limiter(key_func=get_remote_address, default_limits=["50/minute"])
 app = FastAPI(title=settings.PROJECT_NAME, debug=settings.DEBUG,)
 
 @app.on_event("startup")
@@ -22,6 +24,10 @@ async def startup_event():
         connect(host=settings.MONGO_DB_URI)
     else:
         connect(settings.MONGO_DB, host=settings.MONGO_HOST, port=settings.MONGO_PORT)
+    get_hash_pool()
+    await database.connect()
+    get_redis_pool()
+    app.state.invalidation_listener = start_invalidation_listener()
     if settings.CLOUDINARY_CLOUD_NAME:
         cloudinary.config(
             cloud_name = settings.CLOUDINARY_CLOUD_NAME,
@@ -29,6 +35,13 @@ async def startup_event():
             api_secret = settings.CLOUDINARY_API_SECRET
         )
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await database.disconnect()
+    shutdown_hash_pool()
+    if app.state.invalidation_listener:
+        app.state.invalidation_listener.stop()
+
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
         CORSMiddleware,
@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql.schema import Column, ForeignKey
+from sqlalchemy.sql.schema import Column, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.sql.sqltypes import DateTime
 
 from app.db.base_class import Base
 from .user import User
 
 class Appointment(Base):
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    __table_args__ = (
+        UniqueConstraint("provider_id", "date", name="uq_appointments_provider_id_date"),
+        Index("ix_appointments_user_id_date_id", "user_id", "date", "id"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     provider_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     date = Column(DateTime(timezone=True))
@@ -7,5 +7,16 @@ class Notification(Document):
     recipient_id = StringField()
     read = BooleanField(default=False)
 
-    created_at = DateTimeField(default=datetime.utcnow())
-    updated_at = DateTimeField(default=datetime.utcnow())
\ No newline at end of file
+    created_at = DateTimeField(default=datetime.utcnow)
+    updated_at = DateTimeField(default=datetime.utcnow)
+
+    meta = {
+        "indexes": [
+            # unread notifications of a provider, newest first, _id breaks
+            # the ties of the pagination cursor
+            {
+                "fields": ["recipient_id", "read", "-created_at", "-_id"],
+                "name": "recipient_id_read_created_at"
+            }
+        ]
+    }
@@ -0,0 +1,17 @@
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql.schema import Column, ForeignKey
+from sqlalchemy.sql.sqltypes import BigInteger, Date, Integer
+
+from app.db.base_class import Base
+
+class ProviderDayOccupancy(Base):
+    """
+    Daily rollup of a provider appointments, slot_mask has a bit set for every
+    booked 30 minutes cell of the provider local day (see app.core.schedule)
+    """
+    __tablename__ = "provider_day_occupancy"
+
+    provider_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    booked_count = Column(Integer, nullable=False, default=0)
+    slot_mask = Column(BigInteger, nullable=False, default=0)
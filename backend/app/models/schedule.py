@@ -0,0 +1,21 @@
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.sql.schema import Column, ForeignKey
+from sqlalchemy.sql.sqltypes import SmallInteger, String
+
+from app.db.base_class import Base
+
+class ProviderSchedule(Base):
+    """
+    Working hours of a provider, times are minutes since the local midnight,
+    breaks is a flat [start, end, start, end, ...] list and working_days has
+    bit `date.weekday()` set for every working day
+    """
+    __tablename__ = "provider_schedules"
+
+    provider_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    timezone = Column(String, nullable=False)
+    slot_minutes = Column(SmallInteger, nullable=False)
+    opening = Column(SmallInteger, nullable=False)
+    closing = Column(SmallInteger, nullable=False)
+    breaks = Column(ARRAY(SmallInteger), nullable=False, default=list)
+    working_days = Column(SmallInteger, nullable=False)
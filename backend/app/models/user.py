@@ -1,13 +1,24 @@
 import uuid
 from datetime import datetime
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.schema import Column, Index
+from sqlalchemy.sql.expression import text
 from sqlalchemy.sql.sqltypes import DateTime, String, Boolean
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
 
 class User(Base):
+    __table_args__ = (
+        # keyset pagination of the providers directory
+        Index(
+            "ix_users_providers_name_id", 
+            "name", 
+            "id", 
+            postgresql_where=text("address IS NOT NULL AND is_active")
+        ),
+    )
+
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
     name = Column(String, nullable=False)
     surname = Column(String, nullable=False)
@@ -24,11 +35,11 @@ class User(Base):
         "Appointment", 
         foreign_keys="Appointment.provider_id",
         backref="provider",
-        lazy='subquery'
+        lazy='select'
     )
     user_appointments = relationship(
         "Appointment", 
         foreign_keys="Appointment.user_id",
         backref="user",
-        lazy='subquery'
+        lazy='select'
     )
\ No newline at end of file
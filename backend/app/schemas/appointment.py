@@ -1,4 +1,3 @@
-import pytz
 from datetime import datetime, timezone
 from pydantic import BaseModel, UUID4, validator
 
@@ -12,9 +11,12 @@ class Appointment(AppointmentBase):
 
     @validator("date", pre=True)
     def format_date(cls, value: datetime):
-        return value.replace(
-            tzinfo=timezone.utc
-        ).astimezone(tz=pytz.timezone("America/Sao_Paulo"))
+        # naive dates come from the database in UTC, aware ones are already
+        # in the provider timezone
+        if isinstance(value, datetime) and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+
+        return value
 
     class Config:
         orm_mode = True
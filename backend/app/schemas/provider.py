@@ -1,5 +1,5 @@
-import pytz
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
+from typing import List
 from pydantic import BaseModel
 from pydantic import UUID4, validator
 
@@ -11,8 +11,18 @@ class ProviderDaysAvailability(BaseModel):
 
 class ProviderHoursAvailability(BaseModel):
     hour: int
+    minute: int = 0
     available: bool
 
+class ProviderBatchAvailability(BaseModel):
+    provider_id: UUID4
+    day: date
+    hours: List[ProviderHoursAvailability]
+
+class ProviderSlot(BaseModel):
+    provider_id: UUID4
+    date: datetime
+
 class ProviderMonthAvailabilityQuery(BaseModel):
     provider_id: str
     month: int
@@ -35,14 +45,14 @@ class ProviderAppointments(BaseModel):
     date: datetime
     user: User
 
-    @validator("date", pre=True)
+    @validator("date")
     def format_date(cls, value: datetime):
-        if value.tzname() == '-03':
-            return value
-            
-        return value.replace(
-            tzinfo=timezone.utc
-        ).astimezone(tz=pytz.timezone("America/Sao_Paulo"))
+        # naive dates come from the database in UTC, aware ones are already
+        # in the provider timezone (see crud_appointment.listing_row)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+
+        return value
 
     class Config:
         orm_mode = True
\ No newline at end of file
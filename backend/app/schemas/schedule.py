@@ -0,0 +1,95 @@
+import pytz
+from datetime import time
+from typing import List
+from fastapi.exceptions import HTTPException
+from pydantic import BaseModel, validator
+
+from app.core.schedule import (
+    CELL_MINUTES,
+    DEFAULT_TIMEZONE,
+    DEFAULT_SLOT_MINUTES,
+    DEFAULT_OPENING,
+    DEFAULT_CLOSING,
+    DEFAULT_WORKING_DAYS
+)
+
+def minute_to_time(value):
+    if isinstance(value, int):
+        return time(value // 60, value % 60)
+    return value
+
+def check_grid(value: time) -> time:
+    if value.minute % CELL_MINUTES or value.second or value.microsecond:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Os horários devem ser múltiplos de {CELL_MINUTES} minutos"
+        )
+    return value
+
+class ScheduleBreak(BaseModel):
+    start: time
+    end: time
+
+    _to_time = validator("start", "end", pre=True, allow_reuse=True)(minute_to_time)
+    _grid = validator("start", "end", allow_reuse=True)(check_grid)
+
+    @validator("end")
+    def end_after_start(cls, v, values, **kwargs):
+        if "start" in values and v <= values["start"]:
+            raise HTTPException(status_code=400, detail="O intervalo deve terminar depois de começar")
+        return v
+
+class ProviderSchedule(BaseModel):
+    timezone: str = DEFAULT_TIMEZONE
+    slot_minutes: int = DEFAULT_SLOT_MINUTES
+    opening: time = minute_to_time(DEFAULT_OPENING)
+    closing: time = minute_to_time(DEFAULT_CLOSING)
+    breaks: List[ScheduleBreak] = []
+    # 0 is monday, like date.weekday()
+    working_days: List[int] = [day for day in range(7) if DEFAULT_WORKING_DAYS & (1 << day)]
+
+    _to_time = validator("opening", "closing", pre=True, allow_reuse=True)(minute_to_time)
+    _grid = validator("opening", "closing", allow_reuse=True)(check_grid)
+
+    @validator("timezone")
+    def valid_timezone(cls, v):
+        if v not in pytz.all_timezones_set:
+            raise HTTPException(status_code=400, detail="Fuso horário inválido")
+        return v
+
+    @validator("slot_minutes")
+    def valid_slot_minutes(cls, v):
+        if v % CELL_MINUTES or not CELL_MINUTES <= v <= 8 * 60:
+            raise HTTPException(
+                status_code=400, 
+                detail=f"A duração do horário deve ser múltipla de {CELL_MINUTES} minutos e de até 8 horas"
+            )
+        return v
+
+    @validator("closing")
+    def closing_after_opening(cls, v, values, **kwargs):
+        if "opening" in values and v <= values["opening"]:
+            raise HTTPException(status_code=400, detail="O expediente deve terminar depois de começar")
+        return v
+
+    @validator("breaks", pre=True)
+    def breaks_from_array(cls, v):
+        # stored as a flat [start, end, ...] list of minutes
+        if v and isinstance(v[0], int):
+            return [{"start": start, "end": end} for start, end in zip(v[::2], v[1::2])]
+        return v
+
+    @validator("working_days", pre=True)
+    def working_days_from_bits(cls, v):
+        if isinstance(v, int):
+            return [day for day in range(7) if v & (1 << day)]
+        return v
+
+    @validator("working_days", each_item=True)
+    def valid_working_day(cls, v):
+        if not 0 <= v <= 6:
+            raise HTTPException(status_code=400, detail="Dia da semana inválido")
+        return v
+
+    class Config:
+        orm_mode = True
@@ -1,4 +1,3 @@
-import pytz
 from typing import Optional, Union
 from fastapi.exceptions import HTTPException
 from pydantic import BaseModel, UUID4, validator
@@ -69,14 +68,14 @@ class UserAppointments(BaseModel):
     provider: User
     date: datetime
 
-    @validator("date", pre=True)
+    @validator("date")
     def format_date(cls, value: datetime):
-        if value.tzname() == '-03':
-            return value
-            
-        return value.replace(
-            tzinfo=timezone.utc
-        ).astimezone(tz=pytz.timezone("America/Sao_Paulo"))
+        # naive dates come from the database in UTC, aware ones are already
+        # in the provider timezone (see crud_appointment.listing_row)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+
+        return value
 
     class Config:
         orm_mode = True
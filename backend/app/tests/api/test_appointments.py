@@ -1,10 +1,11 @@
 import pytz
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.tests import utils
 from app.core import security
+from app.utils.date import TIMEZONE
 
 def test_create_appointments(client: TestClient, db: Session) -> None:
     user = utils.create_random_user(db)
@@ -17,19 +18,18 @@ def test_create_appointments(client: TestClient, db: Session) -> None:
     header_1 = {'Authorization': f'Bearer {token_1}'}
     header_2 = {'Authorization': f'Bearer {token_2}'}
     date_1 = datetime(2020, 10, 10, 10, 10)
-    date_2 = datetime.now(timezone.utc)
-    date_2 = date_2.replace(hour=10)
-    date_2 = date_2.replace(day = date_2.day+1)
-    date_3 = datetime.now(timezone.utc)
-    date_3 = date_3.replace(hour=1)
-    date_3 = date_3.replace(day= date_3.day+1)
+    day = datetime.now(TIMEZONE).date() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    date_2 = TIMEZONE.localize(datetime(day.year, day.month, day.day, 10)).isoformat()
+    date_3 = TIMEZONE.localize(datetime(day.year, day.month, day.day, 1)).isoformat()
     date_4 = appointment.date
     # Not being able to make an appointment for past dates
     response_1 = client.post('/appointments', headers=header_1, json={
         "provider_id": str(provider.id),
         "date": str(date_1)
     })
-    # Can only create appointments between 8:00 and 17:00
+    # Can only create appointments on the provider schedule slots
     response_2 = client.post('/appointments', headers=header_1, json={
         "provider_id": str(provider.id),
         "date": str(date_3)
@@ -0,0 +1,91 @@
+from sqlalchemy.orm import Session
+
+from app.core.availability import AvailabilityIndex
+from app.core.cache import RedisCache
+from app.core.schedule import DEFAULT_TEMPLATE
+from app.schemas.provider import ProviderMonthAvailabilityQuery, ProviderDayAvailabilityQuery
+from app.tests import utils
+from app.utils.date import to_local
+
+def test_booked_mask() -> None:
+    assert AvailabilityIndex.booked_mask(None) is None
+    # Cells 8 and 10 set, but never rebuilt
+    assert AvailabilityIndex.booked_mask(b"\x00\xa0\x00\x00\x00\x00\x00\x00") is None
+    bitmap = b"\x00\xa0\x00\x00\x00\x00\x00\x01"
+    assert AvailabilityIndex.booked_mask(bitmap) == (1 << 8) | (1 << 10)
+
+def test_get_day_rebuild(db: Session, rdc: RedisCache) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    appointment = utils.create_random_appointment(db, provider, user)
+    date = to_local(appointment.date)
+    cells = DEFAULT_TEMPLATE.slot_mask(date.hour * 60 + date.minute)
+    availability = AvailabilityIndex(rdc)
+    key = availability.day_key(provider.id, date.year, date.month, date.day)
+    rdc.delete(key)
+    assert availability.is_booked(provider.id, date, cells) is None
+    query = ProviderDayAvailabilityQuery(
+        provider_id=str(provider.id),
+        day=date.day, 
+        month=date.month, 
+        year=date.year)
+    assert availability.get_day(db, query) == cells
+    assert availability.is_booked(provider.id, date, cells) is True
+
+    rdc.delete(key)
+    db.delete(appointment)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_get_month_rebuild(db: Session, rdc: RedisCache) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    appointment = utils.create_random_appointment(db, provider, user)
+    date = to_local(appointment.date)
+    availability = AvailabilityIndex(rdc)
+    query = ProviderMonthAvailabilityQuery(
+        provider_id=str(provider.id), 
+        month=date.month, 
+        year=date.year)
+    booked_by_day = availability.get_month(db, query)
+    assert booked_by_day[date.day] == DEFAULT_TEMPLATE.slot_mask(date.hour * 60 + date.minute)
+    assert not any(mask for day, mask in booked_by_day.items() if day != date.day)
+    # Served from the bitmaps now
+    with utils.count_queries() as statements:
+        assert availability.get_month(db, query) == booked_by_day
+    assert not statements
+
+    rdc.delete(*[
+        availability.day_key(provider.id, date.year, date.month, day) 
+        for day in booked_by_day
+    ])
+    db.delete(appointment)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_invalidate_provider(db: Session, rdc: RedisCache) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    appointment = utils.create_random_appointment(db, provider, user)
+    date = to_local(appointment.date)
+    availability = AvailabilityIndex(rdc)
+    query = ProviderMonthAvailabilityQuery(
+        provider_id=str(provider.id), 
+        month=date.month, 
+        year=date.year)
+    booked_by_day = availability.get_month(db, query)
+    keys = [
+        availability.day_key(provider.id, date.year, date.month, day) 
+        for day in booked_by_day
+    ]
+    assert rdc.exists(*keys) == len(keys)
+    availability.invalidate_provider(provider.id)
+    assert rdc.exists(*keys) == 0
+    assert not rdc.smembers(availability.keys_key(provider.id))
+
+    db.delete(appointment)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
@@ -0,0 +1,37 @@
+from uuid import uuid4
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.api.limiter import limiter, rate_limit_key
+from app.core import security
+from app.core.config import settings
+from app.tests import utils
+
+def make_request(headers: dict = {}) -> Request:
+    return Request({
+        "type": "http",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+        "client": ("10.0.0.1", 5000),
+    })
+
+def test_rate_limit_key() -> None:
+    user_id = str(uuid4())
+    token = security.generate_token(user_id, "access", datetime.utcnow() + timedelta(hours=2))
+    assert rate_limit_key(make_request({"Authorization": f"Bearer {token}"})) == f"user:{user_id}"
+    # Anonymous requests and invalid tokens share the address budget
+    assert rate_limit_key(make_request()) == "ip:10.0.0.1"
+    assert rate_limit_key(make_request({"Authorization": "Bearer invalid"})) == "ip:10.0.0.1"
+
+def test_login_rate_limit(client: TestClient) -> None:
+    budget = int(settings.RATE_LIMIT_LOGIN.split("/")[0])
+    login = {
+        "email": utils.random_email(),
+        "password": utils.random_lower_string(),
+        "host": "mobile"
+    }
+    responses = [client.post('/sessions/access-token', json=login) for _ in range(budget + 1)]
+    assert {response.status_code for response in responses[:budget]} == {400}
+    assert responses[-1].status_code == 429
+
+    limiter.reset()
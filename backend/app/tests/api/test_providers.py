@@ -7,8 +7,14 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.tests import utils
+from app.crud import crud_appointment
+from app.schemas.appointment import AppointmentCreate
 from app.core import security
 from app.core.config import settings
+from app.core.cache import RedisCache
+from app.core.availability import AvailabilityIndex
+from app.core.schedule import DEFAULT_TEMPLATE
+from app.utils.date import TIMEZONE
 
 def test_list_providers(client: TestClient, db: Session) -> None:
     user = utils.create_random_user(db)
@@ -18,7 +24,7 @@ def test_list_providers(client: TestClient, db: Session) -> None:
     token = security.generate_token(str(user.id), 'access', datetime.utcnow() + timedelta(days=1))
     header = {'Authorization': f'Bearer {token}'}
     response = client.get('/providers', headers=header)
-    data = response.json()
+    data = response.json()["items"]
     assert response.status_code == 200
     assert data
     assert data[0]['id'] != str(user.id)
@@ -28,6 +34,60 @@ def test_list_providers(client: TestClient, db: Session) -> None:
     db.commit()
    
     
+def test_list_providers_shared_cache(client: TestClient, db: Session) -> None:
+    provider_1 = utils.create_random_provider(db)
+    provider_1 = utils.activate_random_user(db, provider_1)
+    provider_2 = utils.create_random_provider(db)
+    provider_2 = utils.activate_random_user(db, provider_2)
+    rdc = RedisCache()
+    rdc.invalidate_cache_tags("providers-list")
+    token_1 = security.generate_token(str(provider_1.id), 'access', datetime.utcnow() + timedelta(days=1))
+    token_2 = security.generate_token(str(provider_2.id), 'access', datetime.utcnow() + timedelta(days=1))
+    url = f'/providers?limit={settings.MAX_PAGE_SIZE}'
+    response_1 = client.get(url, headers={'Authorization': f'Bearer {token_1}'})
+    response_2 = client.get(url, headers={'Authorization': f'Bearer {token_2}'})
+    ids_1 = [provider['id'] for provider in response_1.json()["items"]]
+    ids_2 = [provider['id'] for provider in response_2.json()["items"]]
+    assert str(provider_1.id) not in ids_1
+    assert str(provider_2.id) in ids_1
+    assert str(provider_2.id) not in ids_2
+    assert str(provider_1.id) in ids_2
+    assert rdc.exists(rdc.cache_key(f"providers-list::{settings.MAX_PAGE_SIZE}"))
+
+    db.delete(provider_1)
+    db.delete(provider_2)
+    db.commit()
+
+def test_list_providers_pages(client: TestClient, db: Session) -> None:
+    user = utils.create_random_user(db)
+    user = utils.activate_random_user(db, user)
+    providers = [utils.create_random_provider(db) for _ in range(3)]
+    providers = [utils.activate_random_user(db, provider) for provider in providers]
+    RedisCache().invalidate_cache_tags("providers-list")
+    token = security.generate_token(str(user.id), 'access', datetime.utcnow() + timedelta(days=1))
+    header = {'Authorization': f'Bearer {token}'}
+    ids = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get('/providers', params=params, headers=header)
+        page = response.json()
+        assert response.status_code == 200
+        assert len(page["items"]) <= 2
+        ids.extend(provider["id"] for provider in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert len(ids) == len(set(ids))
+    assert {str(provider.id) for provider in providers} <= set(ids)
+    response = client.get('/providers?cursor=invalid', headers=header)
+    assert response.status_code == 400
+
+    db.delete(user)
+    for provider in providers:
+        db.delete(provider)
+    db.commit()
+
 def test_get_provider_me(client: TestClient, db: Session) -> None:
     user = utils.create_random_user(db)
     user = utils.activate_random_user(db, user)
@@ -36,11 +96,12 @@ def test_get_provider_me(client: TestClient, db: Session) -> None:
     appointment = utils.create_random_appointment(db, provider, user)
     token = security.generate_token(str(provider.id), 'access', datetime.utcnow() + timedelta(days=1))
     header = {'Authorization': f'Bearer {token}'}
-    day = appointment.date.day
-    month = appointment.date.month
-    year = appointment.date.year
+    date = appointment.date.astimezone(TIMEZONE)
+    day = date.day
+    month = date.month
+    year = date.year
     response = client.get(f'/providers/me?day={day}&month={month}&year={year}', headers=header)
-    data = response.json()
+    data = response.json()["items"]
     assert response.status_code == 200
     assert data
     assert data[0]['provider_id'] == str(provider.id)
@@ -52,6 +113,71 @@ def test_get_provider_me(client: TestClient, db: Session) -> None:
     db.commit()
     
 
+def test_get_provider_me_pages(client: TestClient, db: Session) -> None:
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    user = utils.create_random_user(db)
+    day = datetime.now(TIMEZONE).date() + timedelta(days=1)
+    for hour in range(10, 15):
+        date = TIMEZONE.localize(datetime(day.year, day.month, day.day, hour))
+        crud_appointment.create(db, AppointmentCreate(provider_id=provider.id, date=date), user)
+    RedisCache().invalidate_cache_tags(f"providers-appointments:{str(provider.id)}")
+    token = security.generate_token(str(provider.id), 'access', datetime.utcnow() + timedelta(days=1))
+    header = {'Authorization': f'Bearer {token}'}
+    dates = []
+    cursor = None
+    while True:
+        params = {
+            "day": day.day, 
+            "month": day.month, 
+            "year": day.year, 
+            "limit": 2, 
+            **({"cursor": cursor} if cursor else {})
+        }
+        response = client.get('/providers/me', params=params, headers=header)
+        page = response.json()
+        assert response.status_code == 200
+        assert len(page["items"]) <= 2
+        dates.extend(item["date"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert len(dates) == 5
+    assert dates == sorted(set(dates))
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_get_provider_me_queries(client: TestClient, db: Session, max_queries) -> None:
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    users = [utils.create_random_user(db) for _ in range(3)]
+    day = datetime.now(TIMEZONE).date() + timedelta(days=1)
+    for hour, user in enumerate(users, start=10):
+        date = TIMEZONE.localize(datetime(day.year, day.month, day.day, hour))
+        crud_appointment.create(db, AppointmentCreate(provider_id=provider.id, date=date), user)
+    RedisCache().invalidate_cache_tags(f"providers-appointments:{str(provider.id)}")
+    token = security.generate_token(str(provider.id), 'access', datetime.utcnow() + timedelta(days=1))
+    header = {'Authorization': f'Bearer {token}'}
+    # the token user, the provider schedule and one statement for the
+    # appointments with their users
+    with max_queries(3):
+        response = client.get(
+            f'/providers/me?day={day.day}&month={day.month}&year={day.year}', 
+            headers=header
+        )
+    data = response.json()["items"]
+    assert response.status_code == 200
+    assert [item["user"]["id"] for item in data] == [str(user.id) for user in users]
+
+    utils.delete_appointments(db, provider)
+    for user in users:
+        db.delete(user)
+    db.delete(provider)
+    db.commit()
+
 def test_list_provider_days_availability(client: TestClient, db: Session) -> None:
     user = utils.create_random_user(db)
     user = utils.activate_random_user(db, user)
@@ -103,6 +229,152 @@ def test_list_provider_hours_availability(client: TestClient, db: Session) -> No
     db.delete(appointment)
     db.commit()
 
+def test_availability_token_only(client: TestClient) -> None:
+    provider_id = str(uuid4())
+    day = datetime.now(TIMEZONE).date() + timedelta(days=1)
+    url = f"/providers/day-availability?provider_id={provider_id}&day={day.day}&month={day.month}&year={day.year}"
+    token = security.generate_token(str(uuid4()), "access", datetime.utcnow() + timedelta(hours=2))
+    # Authentication comes from the token alone, the users table is not read
+    with utils.count_queries() as statements:
+        response = client.get(url, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert not [statement for statement, _ in statements if "FROM users" in statement]
+
+    expired = security.generate_token(str(uuid4()), "access", datetime.utcnow() - timedelta(minutes=1))
+    response = client.get(url, headers={'Authorization': f'Bearer {expired}'})
+    assert response.status_code == 401
+
+    reset = security.generate_token(str(uuid4()), "reset", datetime.utcnow() + timedelta(hours=2))
+    response = client.get(url, headers={'Authorization': f'Bearer {reset}'})
+    assert response.status_code == 401
+
+def test_list_providers_availability(client: TestClient, db: Session) -> None:
+    user = utils.create_random_user(db)
+    user = utils.activate_random_user(db, user)
+    provider_1 = utils.create_random_provider(db)
+    provider_1 = utils.activate_random_user(db, provider_1)
+    provider_2 = utils.create_random_provider(db)
+    provider_2 = utils.activate_random_user(db, provider_2)
+    token = security.generate_token(str(user.id), "access", datetime.utcnow() + timedelta(hours=2))
+    header = {'Authorization': f'Bearer {token}'}
+    day = datetime.now(TIMEZONE).date() + timedelta(days=2)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    date = TIMEZONE.localize(datetime(day.year, day.month, day.day, 10))
+    client.post('/appointments', headers=header, json={
+        "provider_id": str(provider_1.id),
+        "date": date.isoformat()
+    })
+    url = (
+        f"/providers/availability?provider_ids={provider_1.id}&provider_ids={provider_2.id}"
+        f"&start_date={day.isoformat()}&end_date={(day + timedelta(days=1)).isoformat()}"
+    )
+    with utils.count_queries() as statements:
+        response = client.get(url, headers=header)
+    data = response.json()
+    assert response.status_code == 200
+    assert len(data) == 4
+    assert len([s for s, _ in statements if "FROM provider_day_occupancy" in s]) == 1
+    assert not [s for s, _ in statements if "FROM appointments" in s]
+    by_key = {(item['provider_id'], item['day']): item['hours'] for item in data}
+    assert {"hour": 10, "minute": 0, "available": False} in by_key[str(provider_1.id), day.isoformat()]
+    assert {"hour": 10, "minute": 0, "available": True} in by_key[str(provider_2.id), day.isoformat()]
+
+    response = client.get(
+        f"/providers/availability?provider_ids={provider_1.id}"
+        f"&start_date={day.isoformat()}&end_date={(day + timedelta(days=40)).isoformat()}",
+        headers=header
+    )
+    assert response.status_code == 400
+
+    utils.delete_appointments(db, provider_1)
+    db.delete(user)
+    db.delete(provider_1)
+    db.delete(provider_2)
+    db.commit()
+
+def test_list_next_available_slots(client: TestClient, db: Session) -> None:
+    user = utils.create_random_user(db)
+    user = utils.activate_random_user(db, user)
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    token = security.generate_token(str(user.id), "access", datetime.utcnow() + timedelta(hours=2))
+    header = {'Authorization': f'Bearer {token}'}
+    day = datetime.now(TIMEZONE).date() + timedelta(days=2)
+    while day.weekday() >= 4:
+        day += timedelta(days=1)
+    date = TIMEZONE.localize(datetime(day.year, day.month, day.day, 16))
+    client.post('/appointments', headers=header, json={
+        "provider_id": str(provider.id),
+        "date": date.isoformat()
+    })
+    response = client.get(
+        "/providers/next-available", 
+        params={"provider_ids": str(provider.id), "start": date.isoformat(), "limit": 2},
+        headers=header
+    )
+    data = response.json()
+    assert response.status_code == 200
+    # 16h is taken and 17h is the last slot of the day, the next one opens the following weekday
+    assert [datetime.fromisoformat(slot['date']) for slot in data] == [
+        date + timedelta(hours=1),
+        TIMEZONE.localize(datetime(day.year, day.month, day.day, 8)) + timedelta(days=1),
+    ]
+    assert {slot['provider_id'] for slot in data} == {str(provider.id)}
+    response = client.get(
+        "/providers/next-available", 
+        params={"provider_ids": [str(uuid4()) for _ in range(settings.NEXT_SLOTS_MAX_PROVIDERS + 1)]},
+        headers=header
+    )
+    assert response.status_code == 400
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_availability_index_update(client: TestClient, db: Session) -> None:
+    user = utils.create_random_user(db)
+    user = utils.activate_random_user(db, user)
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    token = security.generate_token(str(user.id), "access", datetime.utcnow() + timedelta(hours=2))
+    header = {'Authorization': f'Bearer {token}'}
+    day = datetime.now(TIMEZONE).date() + timedelta(days=2)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    date = TIMEZONE.localize(datetime(day.year, day.month, day.day, 10))
+    day_url = (
+        f"/providers/day-availability?provider_id={provider.id}"
+        f"&day={day.day}&month={day.month}&year={day.year}"
+    )
+    month_url = f"/providers/month-availability?provider_id={provider.id}&month={day.month}&year={day.year}"
+    response_1 = client.get(day_url, headers=header)
+    client.get(month_url, headers=header)
+    availability = AvailabilityIndex(RedisCache())
+    cells = DEFAULT_TEMPLATE.slot_at(date)
+    assert availability.is_booked(provider.id, date, cells) is False
+    response_2 = client.post('/appointments', headers=header, json={
+        "provider_id": str(provider.id),
+        "date": date.isoformat()
+    })
+    response_3 = client.get(day_url, headers=header)
+    # Taken slot rejected by the bitmap before reaching postgres
+    response_4 = client.post('/appointments', headers=header, json={
+        "provider_id": str(provider.id),
+        "date": date.isoformat()
+    })
+    assert response_2.status_code == 201
+    assert response_4.status_code == 400
+    assert {"hour": 10, "minute": 0, "available": True} in response_1.json()
+    assert {"hour": 10, "minute": 0, "available": False} in response_3.json()
+    assert availability.is_booked(provider.id, date, cells) is True
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
 def test_list_provider_notifications(client: TestClient, db: Session) -> None:
     user = utils.create_random_user(db)
     user = utils.activate_random_user(db, user)
@@ -113,7 +385,7 @@ def test_list_provider_notifications(client: TestClient, db: Session) -> None:
     token = security.generate_token(str(provider.id), "access", datetime.utcnow() + timedelta(hours=2))
     header = {'Authorization': f'Bearer {token}'}
     response = client.get("/providers/notifications", headers=header)
-    data = response.json()
+    data = response.json()["items"]
     assert response.status_code == 200
     assert data
     assert data[0]['recipient_id'] == str(provider.id)
@@ -124,6 +396,36 @@ def test_list_provider_notifications(client: TestClient, db: Session) -> None:
     db.commit()
     Notification.delete(notification)
 
+def test_list_provider_notifications_pages(client: TestClient, db: Session) -> None:
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    notifications = [utils.create_random_notification(provider) for _ in range(5)]
+    token = security.generate_token(str(provider.id), "access", datetime.utcnow() + timedelta(hours=2))
+    header = {'Authorization': f'Bearer {token}'}
+
+    ids = []
+    cursor = None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/providers/notifications", headers=header, params=params)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    # newest first, each notification exactly once
+    assert ids == [str(notification.id) for notification in reversed(notifications)]
+
+    response = client.get("/providers/notifications", headers=header, params={"cursor": "x"})
+    assert response.status_code == 400
+
+    db.delete(provider)
+    db.commit()
+    for notification in notifications:
+        Notification.delete(notification)
+
 def test_update_notification(client: TestClient, db: Session) -> None:
     user = utils.create_random_user(db)
     user = utils.activate_random_user(db, user)
@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.tests import utils
+from app.core import security
+from app.core.schedule import DEFAULT_TEMPLATE, compile_template, iter_cells
+from app.crud import crud_schedule
+
+# A monday far from now, so no slot is in the past
+MONDAY = date(2100, 1, 4)
+
+def starts(template) -> list:
+    return [(cell * 30 // 60, cell * 30 % 60) for cell in iter_cells(template.starts)]
+
+def test_default_template() -> None:
+    assert starts(DEFAULT_TEMPLATE) == [(hour, 0) for hour in range(8, 18)]
+    tz = DEFAULT_TEMPLATE.timezone
+    assert DEFAULT_TEMPLATE.slot_at(tz.localize(datetime(2100, 1, 4, 17))) == 0b11 << 34
+    # outside the working hours, off the slot grid and on a saturday
+    assert DEFAULT_TEMPLATE.slot_at(tz.localize(datetime(2100, 1, 4, 18))) is None
+    assert DEFAULT_TEMPLATE.slot_at(tz.localize(datetime(2100, 1, 4, 10, 30))) is None
+    assert DEFAULT_TEMPLATE.slot_at(tz.localize(datetime(2100, 1, 9, 10))) is None
+
+def test_template_breaks_and_slot_length() -> None:
+    lunch = compile_template("America/Sao_Paulo", 60, 8 * 60, 18 * 60, (12 * 60 + 30, 13 * 60 + 30), 0b11111)
+    assert starts(lunch) == [(8, 0), (9, 0), (10, 0), (11, 0), (13, 30), (14, 30), (15, 30), (16, 30)]
+    long_slots = compile_template("Europe/Lisbon", 90, 9 * 60, 15 * 60, (), 0b11111)
+    assert starts(long_slots) == [(9, 0), (10, 30), (12, 0), (13, 30)]
+    # Shared between providers with the same schedule
+    assert compile_template("Europe/Lisbon", 90, 9 * 60, 15 * 60, (), 0b11111) is long_slots
+
+def test_days_availability() -> None:
+    template = compile_template("America/Sao_Paulo", 90, 9 * 60, 15 * 60, (), 0b11111)
+    # A 30 minutes cell booked at 11:00 blocks the 10:30 slot only
+    booked = [1 << 22] + [0] * 6
+    week = template.days_availability(MONDAY, booked)
+    assert week[0] == [
+        {'hour': 9, 'minute': 0, 'available': True},
+        {'hour': 10, 'minute': 30, 'available': False},
+        {'hour': 12, 'minute': 0, 'available': True},
+        {'hour': 13, 'minute': 30, 'available': True},
+    ]
+    assert all(slot['available'] for slot in week[1])
+    assert not any(slot['available'] for slot in week[5] + week[6])
+
+def test_days_availability_past_slots() -> None:
+    tz = DEFAULT_TEMPLATE.timezone
+    now = tz.localize(datetime(2100, 1, 4, 9, 59, 30))
+    day, = DEFAULT_TEMPLATE.days_availability(MONDAY, [0], now)
+    assert [slot['hour'] for slot in day if slot['available']] == list(range(10, 18))
+    slots = list(DEFAULT_TEMPLATE.free_slots(MONDAY, [0, 0], now))
+    assert slots[0] == tz.localize(datetime(2100, 1, 4, 10))
+    assert slots[8] == tz.localize(datetime(2100, 1, 5, 8))
+
+def test_update_provider_schedule(client: TestClient, db: Session) -> None:
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    token = security.generate_token(str(provider.id), "access", datetime.utcnow() + timedelta(hours=2))
+    header = {'Authorization': f'Bearer {token}'}
+    response_1 = client.get('/providers/schedule', headers=header)
+    response_2 = client.put('/providers/schedule', headers=header, json={
+        "timezone": "Europe/Lisbon",
+        "slot_minutes": 90,
+        "opening": "09:00",
+        "closing": "15:00",
+        "breaks": [{"start": "12:00", "end": "12:30"}],
+        "working_days": [0, 1, 2, 3, 4, 5]
+    })
+    # Off the 30 minutes grid
+    response_3 = client.put('/providers/schedule', headers=header, json={
+        "slot_minutes": 45
+    })
+    assert response_1.status_code == 200
+    assert response_1.json()["slot_minutes"] == 60
+    assert response_2.status_code == 200
+    assert response_2.json()["breaks"] == [{"start": "12:00:00", "end": "12:30:00"}]
+    assert response_3.status_code == 400
+    template = crud_schedule.get_template(db, provider.id)
+    assert template.timezone.zone == "Europe/Lisbon"
+    assert starts(template) == [(9, 0), (10, 30), (12, 30)]
+
+    db.delete(provider)
+    db.commit()
+
+def test_appointment_dates_in_provider_timezone(client: TestClient, db: Session) -> None:
+    user = utils.create_random_user(db)
+    user = utils.activate_random_user(db, user)
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    provider_token = security.generate_token(str(provider.id), "access", datetime.utcnow() + timedelta(hours=2))
+    user_token = security.generate_token(str(user.id), "access", datetime.utcnow() + timedelta(hours=2))
+    provider_header = {'Authorization': f'Bearer {provider_token}'}
+    user_header = {'Authorization': f'Bearer {user_token}'}
+    client.put('/providers/schedule', headers=provider_header, json={"timezone": "Asia/Tokyo"})
+    response_1 = client.post('/appointments', headers=user_header, json={
+        "provider_id": str(provider.id),
+        "date": "2100-01-04T10:00:00+09:00"
+    })
+    response_2 = client.get(
+        f'/providers/me?day={MONDAY.day}&month={MONDAY.month}&year={MONDAY.year}', 
+        headers=provider_header
+    )
+    response_3 = client.get('/users/me', headers=user_header)
+    assert response_1.status_code == 201
+    assert response_1.json()["date"] == "2100-01-04T10:00:00+09:00"
+    assert [item["date"] for item in response_2.json()["items"]] == ["2100-01-04T10:00:00+09:00"]
+    assert "2100-01-04T10:00:00+09:00" in [item["date"] for item in response_3.json()["items"]]
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
@@ -3,8 +3,11 @@ from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
+from passlib.hash import bcrypt
+
 from app.tests import utils
 from app.core import security
+from app.crud import crud_user
 
 def test_access_token(client: TestClient, db: Session) -> None:
     password = utils.random_lower_string()
@@ -50,6 +53,29 @@ def test_access_token(client: TestClient, db: Session) -> None:
     assert "token" in data
     assert data["token"]
     
+def test_access_token_rehash(client: TestClient, db: Session) -> None:
+    password = utils.random_lower_string()
+    user = utils.create_random_user(db, password)
+    user = utils.activate_random_user(db, user)
+    # Hashed with a lower cost than BCRYPT_ROUNDS
+    cheap_hash = bcrypt.using(rounds=4).hash(password)
+    crud_user.update_password_hash(db, user, cheap_hash)
+    assert security.pwd_context.needs_update(user.hashed_password)
+
+    response = client.post('/sessions/access-token', json={
+        "email": user.email,
+        "password": password,
+        "host": "mobile"
+    })
+    db.refresh(user)
+    assert response.status_code == 200
+    assert user.hashed_password != cheap_hash
+    assert not security.pwd_context.needs_update(user.hashed_password)
+    assert security.verify_password(password, user.hashed_password)
+
+    db.delete(user)
+    db.commit()
+
 def test_request_forgot_password(client: TestClient, db: Session) -> None:
     password = utils.random_lower_string()
     user = utils.create_random_user(db, password)
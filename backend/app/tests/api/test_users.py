@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 
 from app.tests import utils
 from app.core import security
+from app.core.cache import RedisCache
 from app.core.config import settings
 
 def test_create_users(client: TestClient, db: Session) -> None:
@@ -164,7 +165,7 @@ def test_get_user_me(client: TestClient, db: Session) -> None:
     token = security.generate_token(str(user.id), "access", datetime.utcnow() + timedelta(hours=2))
     header = {'Authorization': f'Bearer {token}'}
     response = client.get("/users/me", headers=header)
-    data = response.json()
+    data = response.json()["items"]
     assert response.status_code == 200
     assert data
     assert data[0]['user_id'] == str(user.id)
@@ -174,4 +175,26 @@ def test_get_user_me(client: TestClient, db: Session) -> None:
     db.delete(provider)
     db.delete(appointment)
     db.commit()
-   
\ No newline at end of file
+   
+
+def test_get_user_me_queries(client: TestClient, db: Session, max_queries) -> None:
+    user = utils.create_random_user(db)
+    user = utils.activate_random_user(db, user)
+    providers = [utils.create_random_provider(db) for _ in range(3)]
+    for provider in providers:
+        utils.create_random_appointment(db, provider, user)
+    RedisCache().invalidate_cache_tags(f"user-appointments:{str(user.id)}")
+    token = security.generate_token(str(user.id), "access", datetime.utcnow() + timedelta(hours=2))
+    header = {'Authorization': f'Bearer {token}'}
+    # the token user and one statement for the appointments with their providers
+    with max_queries(2):
+        response = client.get("/users/me", headers=header)
+    data = response.json()["items"]
+    assert response.status_code == 200
+    assert {item["provider"]["id"] for item in data} == {str(provider.id) for provider in providers}
+
+    for provider in providers:
+        utils.delete_appointments(db, provider)
+        db.delete(provider)
+    db.delete(user)
+    db.commit()
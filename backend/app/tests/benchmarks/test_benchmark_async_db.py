@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, List
+from databases import Database
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.crud import crud_user, crud_appointment
+from app.db.session import SessionLocal, database
+from app.tests import utils
+
+CONCURRENT_REQUESTS = 200
+TOTAL_REQUESTS = 2000
+TOTAL_APPOINTMENTS = 50
+
+def list_user_appointments(user_id: str) -> Any:
+    """
+    What the sync /users/me does: authenticate and list, on a threadpool thread
+    """
+    db = SessionLocal()
+    try:
+        user = crud_user.get_user_by_id(db, user_id)
+        return crud_appointment.get_appointments_by_user(db, user, limit=settings.PAGE_SIZE + 1)
+    finally:
+        db.close()
+
+async def run_load(request: Callable[[], Awaitable[Any]]) -> List[float]:
+    """
+    Keep CONCURRENT_REQUESTS requests in flight until TOTAL_REQUESTS are
+    done, returns the latency of each one
+    """
+    timings = []
+    remaining = iter(range(TOTAL_REQUESTS))
+
+    async def worker() -> None:
+        for _ in remaining:
+            start = time.perf_counter()
+            await request()
+            timings.append(time.perf_counter() - start)
+
+    await asyncio.gather(*[worker() for _ in range(CONCURRENT_REQUESTS)])
+    return timings
+
+def report(label: str, timings: List[float], elapsed: float) -> None:
+    timings.sort()
+    rps = len(timings) / elapsed
+    print(
+        f"\n{label}: {rps:.0f} req/s "
+        f"p50={timings[len(timings) // 2] * 1000:.2f}ms "
+        f"p99={timings[int(len(timings) * 0.99)] * 1000:.2f}ms"
+    )
+
+def test_sync_vs_async_database(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    utils.create_bulk_appointments(db, provider, user, TOTAL_APPOINTMENTS)
+    user_id = str(user.id)
+
+    async def benchmark() -> None:
+        # A pool of its own, the app one is only connected while a test client is open
+        async_database = Database(
+            str(database.url),
+            min_size=settings.ASYNC_DB_POOL_MIN_SIZE,
+            max_size=settings.ASYNC_DB_POOL_MAX_SIZE
+        )
+        await async_database.connect()
+
+        async def sync_request() -> Any:
+            return await run_in_threadpool(list_user_appointments, user_id)
+
+        async def async_request() -> Any:
+            db_user = await crud_user.get_user_by_id_async(async_database, user_id)
+            return await crud_appointment.get_appointments_by_user_async(
+                async_database, db_user, limit=settings.PAGE_SIZE + 1
+            )
+
+        try:
+            assert len(await sync_request()) == len(await async_request())
+
+            start = time.perf_counter()
+            timings = await run_load(sync_request)
+            report(
+                f"sync session on the threadpool, {CONCURRENT_REQUESTS} concurrent",
+                timings,
+                time.perf_counter() - start
+            )
+
+            start = time.perf_counter()
+            timings = await run_load(async_request)
+            report(
+                f"asyncpg, {CONCURRENT_REQUESTS} concurrent",
+                timings,
+                time.perf_counter() - start
+            )
+        finally:
+            await async_database.disconnect()
+
+    asyncio.get_event_loop().run_until_complete(benchmark())
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
@@ -0,0 +1,51 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.tests import utils
+from app.core import security
+from app.core.cache import invalidate_principal
+
+TOTAL_APPOINTMENTS = 10000
+ROUNDS = 20
+
+def test_get_user_busy_provider(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    utils.create_bulk_appointments(db, provider, user, TOTAL_APPOINTMENTS)
+    token = security.generate_token(str(provider.id), 'access', datetime.utcnow() + timedelta(days=1))
+    authorization = f'Bearer {token}'
+
+    def authenticate(cached: bool) -> None:
+        timings = []
+        for _ in range(ROUNDS):
+            db.expire_all()
+            if not cached:
+                invalidate_principal(provider.id)
+            with utils.count_queries() as statements:
+                start = time.perf_counter()
+                db_user = deps.get_user(Authorization=authorization, db=db)
+                timings.append(time.perf_counter() - start)
+            # Authentication must not touch the appointment collections, and
+            # a cached principal not even the user row
+            assert len(statements) == (0 if cached else 1)
+            assert db_user.id == provider.id
+
+        timings.sort()
+        print(
+            f"\nget_user with {TOTAL_APPOINTMENTS} appointments, "
+            f"{'cached' if cached else 'not cached'}: "
+            f"queries/request={0 if cached else 1} "
+            f"median={timings[len(timings) // 2] * 1000:.2f}ms "
+            f"max={timings[-1] * 1000:.2f}ms"
+        )
+
+    authenticate(cached=False)
+    deps.get_user(Authorization=authorization, db=db)
+    authenticate(cached=True)
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
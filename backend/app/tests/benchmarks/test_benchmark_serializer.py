@@ -0,0 +1,80 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List
+from pydantic import parse_obj_as
+
+from app.core.serializer import serializers
+from app.schemas.user import User, UserAppointments
+from app.schemas.provider import ProviderAppointments
+from app.tests import utils
+
+ROUNDS = 200
+
+def random_user(address: str = None) -> User:
+    return User(
+        id=uuid.uuid4(),
+        name=utils.random_lower_string(),
+        surname=utils.random_lower_string(),
+        email=utils.random_email(),
+        address=address,
+        avatar=f"https://res.cloudinary.com/gobarber/{uuid.uuid4().hex}.png"
+    )
+
+def providers_list(total: int = 200) -> List[User]:
+    return [random_user(utils.random_lower_string()) for _ in range(total)]
+
+def providers_appointments(total: int = 10) -> List[ProviderAppointments]:
+    provider_id = uuid.uuid4()
+    start = datetime.now(timezone.utc).replace(hour=11, minute=0, second=0, microsecond=0)
+    return [
+        ProviderAppointments(
+            id=uuid.uuid4(),
+            provider_id=provider_id,
+            date=start + timedelta(hours=i),
+            user=random_user()
+        )
+        for i in range(total)
+    ]
+
+def user_appointments(total: int = 50) -> List[UserAppointments]:
+    user_id = uuid.uuid4()
+    start = datetime.now(timezone.utc).replace(hour=11, minute=0, second=0, microsecond=0)
+    return [
+        UserAppointments(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            date=start + timedelta(days=i),
+            provider=random_user(utils.random_lower_string())
+        )
+        for i in range(total)
+    ]
+
+def timeit(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        function()
+    return (time.perf_counter() - start) / ROUNDS * 1_000_000
+
+def test_serializers_cached_endpoints() -> None:
+    payloads = {
+        "providers-list": (List[User], providers_list()),
+        "providers-appointments": (List[ProviderAppointments], providers_appointments()),
+        "user-appointments": (List[UserAppointments], user_appointments()),
+    }
+    print()
+    for endpoint, (schema, value) in payloads.items():
+        sizes = {}
+        for name, serializer in serializers.items():
+            data = serializer.dumps(value)
+            sizes[name] = len(data)
+            encode = timeit(lambda: serializer.dumps(value))
+            decode = timeit(lambda: serializer.loads(data))
+            print(
+                f"{endpoint:<24} {name:<8} "
+                f"bytes={len(data):<8} encode={encode:.1f}us decode={decode:.1f}us"
+            )
+            # The response model must rebuild the same value from the cache entry
+            assert parse_obj_as(schema, serializer.loads(data)) == value
+
+        assert sizes["orjson"] < sizes["pickle"]
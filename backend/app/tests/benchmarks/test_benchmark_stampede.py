@@ -0,0 +1,67 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from sqlalchemy.orm import Session
+
+from app.core.cache import RedisCache
+from app.crud import crud_user
+from app.db.session import SessionLocal
+from app.tests import utils
+
+CONCURRENT_REQUESTS = 10
+
+def list_providers(user_id: str) -> Any:
+    db = SessionLocal()
+    try:
+        user = crud_user.get_user_by_id(db, user_id)
+        return crud_user.get_all_providers(db, user)
+    finally:
+        db.close()
+
+def burst(request: Callable[[], Any]) -> int:
+    """
+    Fire concurrent requests at once and return the number of provider queries
+    """
+    barrier = threading.Barrier(CONCURRENT_REQUESTS)
+
+    def run(_) -> Any:
+        barrier.wait()
+        return request()
+
+    with utils.count_queries() as statements:
+        with ThreadPoolExecutor(max_workers=CONCURRENT_REQUESTS) as executor:
+            list(executor.map(run, range(CONCURRENT_REQUESTS)))
+
+    return len([s for s, _ in statements if "users.address IS NOT NULL" in s])
+
+def test_cache_miss_burst(db: Session, rdc: RedisCache) -> None:
+    user = utils.create_random_user(db)
+    user_id = str(user.id)
+    key = f"teste:stampede:{utils.random_lower_string()}"
+
+    def naive() -> Any:
+        value = rdc.get_from_cache(key)
+        if not value:
+            value = list_providers(user_id)
+            rdc.set_to_cache(key, [str(provider.id) for provider in value])
+        return value
+
+    def single_flight() -> Any:
+        return rdc.get_or_set(
+            key, 
+            lambda: [str(provider.id) for provider in list_providers(user_id)],
+            beta=0
+        )
+
+    naive_queries = burst(naive)
+    rdc.invalidate_cache(key)
+    single_flight_queries = burst(single_flight)
+    print(
+        f"\n{CONCURRENT_REQUESTS} concurrent misses: "
+        f"naive={naive_queries} queries single-flight={single_flight_queries} queries"
+    )
+    assert single_flight_queries == 1
+
+    rdc.invalidate_cache(key)
+    db.delete(user)
+    db.commit()
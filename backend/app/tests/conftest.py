@@ -1,14 +1,18 @@
 from app.core.cache import RedisCache
 import pytest
-from typing import Generator
+from contextlib import contextmanager
+from typing import Callable, Generator
 from starlette.testclient import TestClient
 from app.db.session import SessionLocal
+from app.tests import utils
 
 from app.main import app
 
 
 @pytest.fixture(scope="module")
 def client():
+    # Rate limits are kept in redis, every module starts with full budgets
+    app.state.limiter.reset()
     with TestClient(app) as c:
         yield c
 
@@ -22,3 +26,17 @@ def rdc() -> Generator:
     Get redis database
     """
     yield RedisCache()
+
+@pytest.fixture
+def max_queries() -> Callable:
+    """
+    Fail when a block sends more SQL statements than allowed, 
+    e.g. `with max_queries(2): client.get(...)`
+    """
+    @contextmanager
+    def assert_max_queries(total: int) -> Generator:
+        with utils.count_queries() as statements:
+            yield statements
+        assert len(statements) <= total, "\n\n".join(statement for statement, _ in statements)
+
+    return assert_max_queries
@@ -1,12 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
 from app.schemas.appointment import AppointmentCreate
 from app.crud import crud_appointment
+from app.db.session import SessionLocal
 from app.tests import utils
-from app.schemas.provider import (
-    ProviderMonthAvailabilityQuery, 
-    ProviderDayAvailabilityQuery)
+from app.utils.date import TIMEZONE
+from app.schemas.provider import ProviderDayAvailabilityQuery
 
 
 def test_create_appointment(db: Session) -> None:
@@ -25,45 +26,46 @@ def test_create_appointment(db: Session) -> None:
     db.delete(provider)
     db.commit()
 
-def test_get_appointments_by_user(db: Session) -> None:
+def test_create_appointment_taken_slot(db: Session) -> None:
     user = utils.create_random_user(db)
     provider = utils.create_random_provider(db)
     appointment = utils.create_random_appointment(db, provider, user)
-    user_appointments = crud_appointment.get_appointments_by_user(db, user)
-    assert user_appointments[0].user_id == user.id
+    appointment_in = AppointmentCreate(provider_id=provider.id, date=appointment.date)
+    assert crud_appointment.create(db, appointment_in, user) is None
 
     db.delete(appointment)
     db.delete(user)
     db.delete(provider)
     db.commit()
 
-def test_get_appointment_by_date(db: Session) -> None:
+def test_create_appointment_concurrent(db: Session) -> None:
     user = utils.create_random_user(db)
     provider = utils.create_random_provider(db)
-    appointment = utils.create_random_appointment(db, provider, user)
-    date = appointment.date
-    date_appointment = crud_appointment.get_appointment_by_date(db, str(provider.id), date)
-    assert date_appointment.provider_id == provider.id
-    assert date_appointment.date == date
+    date = datetime.now(timezone.utc)
+    appointment_in = AppointmentCreate(provider_id=provider.id, date=date)
+
+    def book(_) -> bool:
+        session = SessionLocal()
+        try:
+            return crud_appointment.create(session, appointment_in, user) is not None
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(book, range(30)))
+    assert results.count(True) == 1
+    utils.delete_appointments(db, provider)
 
-    db.delete(appointment)
     db.delete(user)
     db.delete(provider)
     db.commit()
 
-def test_get_appointments_by_MY(db: Session) -> None:
+def test_get_appointments_by_user(db: Session) -> None:
     user = utils.create_random_user(db)
     provider = utils.create_random_provider(db)
     appointment = utils.create_random_appointment(db, provider, user)
-    date = appointment.date
-    query = ProviderMonthAvailabilityQuery(
-        provider_id=str(provider.id), 
-        month=date.month, 
-        year=date.year)
-    my_appointment = crud_appointment.get_appointments_by_MY(db, query)
-    assert str(my_appointment[0].provider_id) == query.provider_id
-    assert my_appointment[0].date.month == query.month
-    assert my_appointment[0].date.year == query.year
+    user_appointments = crud_appointment.get_appointments_by_user(db, user)
+    assert user_appointments[0].user_id == user.id
 
     db.delete(appointment)
     db.delete(user)
@@ -74,7 +76,7 @@ def test_get_appointments_by_DMY(db: Session) -> None:
     user = utils.create_random_user(db)
     provider = utils.create_random_provider(db)
     appointment = utils.create_random_appointment(db, provider, user)
-    date = appointment.date
+    date = appointment.date.astimezone(TIMEZONE)
     query = ProviderDayAvailabilityQuery(
         provider_id=str(provider.id),
         day=date.day, 
@@ -82,18 +84,44 @@ def test_get_appointments_by_DMY(db: Session) -> None:
         year=date.year)
     my_appointment_1 = crud_appointment.get_appointments_by_DMY(db, query)
     my_appointment_2 = crud_appointment.get_appointments_by_DMY(db, query, provider)
+    date_1 = my_appointment_1[0].date.astimezone(TIMEZONE)
+    date_2 = my_appointment_2[0].date.astimezone(TIMEZONE)
     assert str(my_appointment_1[0].provider_id) == query.provider_id
-    assert my_appointment_1[0].date.day == query.day
-    assert my_appointment_1[0].date.month == query.month
-    assert my_appointment_1[0].date.year == query.year
+    assert date_1.day == query.day
+    assert date_1.month == query.month
+    assert date_1.year == query.year
     assert my_appointment_2[0].provider_id == provider.id
-    assert my_appointment_2[0].date.day == query.day
-    assert my_appointment_2[0].date.month == query.month
-    assert my_appointment_2[0].date.year == query.year
+    assert date_2.day == query.day
+    assert date_2.month == query.month
+    assert date_2.year == query.year
 
     db.delete(appointment)
     db.delete(user)
     db.delete(provider)
     db.commit()
 
+def test_appointment_lookups_use_indexes(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    appointment = utils.create_random_appointment(db, provider, user)
+    date = appointment.date.astimezone(TIMEZONE)
+    day_query = ProviderDayAvailabilityQuery(
+        provider_id=str(provider.id),
+        day=date.day, 
+        month=date.month, 
+        year=date.year)
+    # The test table is tiny, keep the planner from preferring a seq scan
+    db.execute("SET enable_seqscan = off")
+    with utils.count_queries() as statements:
+        crud_appointment.get_appointments_by_DMY(db, day_query)
+        crud_appointment.get_appointments_by_user(db, user)
+    plan_1 = utils.explain(db, *statements[0])
+    plan_2 = utils.explain(db, *statements[1])
+    db.execute("SET enable_seqscan = on")
+    assert "uq_appointments_provider_id_date" in plan_1
+    assert "ix_appointments_user_id_date_id" in plan_2
 
+    db.delete(appointment)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
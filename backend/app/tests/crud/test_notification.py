@@ -22,16 +22,24 @@ def test_create_notification(db: Session) -> None:
     db.commit()
     Notification.delete(notification)
 
-def test_get_all_notifications(db: Session) -> None:
+def test_get_notifications_page(db: Session) -> None:
     provider = utils.create_random_provider(db)
-    document = utils.create_random_notification(provider)
-    provider_notifications = crud_notification.get_all_notifications(str(provider.id))
-    assert provider_notifications
-    assert provider_notifications[0]['id'] == document.id
-    assert provider_notifications[0]['recipient_id'] == str(provider.id)
+    documents = [utils.create_random_notification(provider) for _ in range(3)]
+    first_page = crud_notification.get_notifications_page(str(provider.id), limit=2)
+    assert [item['id'] for item in first_page] == [documents[2].id, documents[1].id]
+    # only the fields of the response are fetched
+    assert set(first_page[0]) == {'id', 'recipient_id', 'content', 'read', 'created_at'}
+
+    last = first_page[-1]
+    second_page = crud_notification.get_notifications_page(
+        str(provider.id), (last['created_at'], last['id']), limit=2
+    )
+    assert [item['id'] for item in second_page] == [documents[0].id]
 
     db.delete(provider)
     db.commit()
+    for document in documents:
+        Notification.delete(document)
 
 def test_update_notification(db: Session) -> None:
     provider = utils.create_random_provider(db)
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from app.schemas.appointment import AppointmentCreate
+from app.core.schedule import DEFAULT_TEMPLATE, compile_template
+from app.crud import crud_appointment, crud_occupancy
+from app.models.occupancy import ProviderDayOccupancy
+from app.tests import utils
+from app.utils.date import TIMEZONE, to_local
+from app.schemas.provider import (
+    ProviderMonthAvailabilityQuery, 
+    ProviderDayAvailabilityQuery)
+
+
+def test_create_appointment_updates_occupancy(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    date = datetime.now(TIMEZONE) + timedelta(days=1)
+    date = date.replace(hour=10, minute=0, second=0, microsecond=0)
+    for hour in (0, 2):
+        appointment_in = AppointmentCreate(
+            provider_id=provider.id, 
+            date=date + timedelta(hours=hour)
+        )
+        assert crud_appointment.create(db, appointment_in, user)
+    # A taken slot rolls back without touching the rollup
+    taken_in = AppointmentCreate(provider_id=provider.id, date=date)
+    assert crud_appointment.create(db, taken_in, user) is None
+
+    query = ProviderDayAvailabilityQuery(
+        provider_id=str(provider.id),
+        day=date.day, 
+        month=date.month, 
+        year=date.year)
+    occupancy = crud_occupancy.get_occupancy_by_DMY(db, query)
+    assert occupancy.booked_count == 2
+    assert occupancy.slot_mask == (
+        DEFAULT_TEMPLATE.slot_mask(10 * 60) | DEFAULT_TEMPLATE.slot_mask(12 * 60)
+    )
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_get_occupancy_by_MY(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    appointment = utils.create_random_appointment(db, provider, user)
+    date = to_local(appointment.date)
+    query = ProviderMonthAvailabilityQuery(
+        provider_id=str(provider.id), 
+        month=date.month, 
+        year=date.year)
+    occupancy = crud_occupancy.get_occupancy_by_MY(db, query)
+    assert [(row.day, row.booked_count) for row in occupancy] == [(date.date(), 1)]
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_backfill(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    appointment = utils.create_random_appointment(db, provider, user)
+    date = to_local(appointment.date)
+    db.query(ProviderDayOccupancy).filter_by(provider_id=provider.id).delete()
+    db.commit()
+
+    assert crud_occupancy.backfill(db) >= 1
+    assert str(provider.id) in crud_occupancy.get_provider_ids(db)
+    query = ProviderDayAvailabilityQuery(
+        provider_id=str(provider.id),
+        day=date.day, 
+        month=date.month, 
+        year=date.year)
+    occupancy = crud_occupancy.get_occupancy_by_DMY(db, query)
+    assert occupancy.booked_count == 1
+    assert occupancy.slot_mask == DEFAULT_TEMPLATE.slot_mask(date.hour * 60 + date.minute)
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
+
+def test_create_appointment_overlapping_slot(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider = utils.create_random_provider(db)
+    template = compile_template("America/Sao_Paulo", 90, 8 * 60, 18 * 60, (), 0b1111111)
+    date = datetime.now(TIMEZONE) + timedelta(days=1)
+    date = date.replace(hour=10, minute=0, second=0, microsecond=0)
+    appointment_in = AppointmentCreate(provider_id=provider.id, date=date)
+    assert crud_appointment.create(db, appointment_in, user, template)
+    # Different start, so only the occupancy cells tell the slots overlap
+    overlapping_in = AppointmentCreate(provider_id=provider.id, date=date + timedelta(minutes=60))
+    assert crud_appointment.create(db, overlapping_in, user, template) is None
+    next_in = AppointmentCreate(provider_id=provider.id, date=date + timedelta(minutes=90))
+    assert crud_appointment.create(db, next_in, user, template)
+
+    utils.delete_appointments(db, provider)
+    db.delete(user)
+    db.delete(provider)
+    db.commit()
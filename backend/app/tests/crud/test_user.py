@@ -1,9 +1,14 @@
+import asyncio
 from app.core.security import verify_password
+from databases import Database
 from sqlalchemy.orm import Session
 
 from app.schemas.user import UserCreate, UserUpdate
 from app.tests import utils
+from app.core.cache import principal_cache
 from app.crud import crud_user
+from app.db.session import database
+from app.models.user import User
 
 
 def test_create_user(db: Session) -> None:
@@ -100,6 +105,37 @@ def test_get_user_by_id(db: Session) -> None:
     db.delete(user)
     db.commit()
 
+def test_get_principal(db: Session) -> None:
+    user = utils.create_random_user(db)
+    user_id = str(user.id)
+    assert crud_user.get_principal(db, user_id).id == user.id
+    assert principal_cache.get(user_id)["email"] == user.email
+    with utils.count_queries() as statements:
+        assert crud_user.get_principal(db, user_id).id == user.id
+    assert not statements
+
+    crud_user.update_password(db, user, utils.random_lower_string())
+    assert principal_cache.get(user_id) is None
+
+    db.delete(user)
+    db.commit()
+
+def test_get_user_by_id_async(db: Session) -> None:
+    user = utils.create_random_user(db)
+
+    async def get_user() -> User:
+        async with Database(str(database.url)) as async_database:
+            return await crud_user.get_user_by_id_async(async_database, str(user.id))
+
+    db_user = asyncio.get_event_loop().run_until_complete(get_user())
+    assert db_user
+    assert db_user.id == user.id
+    assert db_user.name == user.name
+    assert db_user.email == user.email
+
+    db.delete(user)
+    db.commit()
+
 def test_get_user_by_email(db: Session) -> None:
     user = utils.create_random_user(db)
     db_user = crud_user.get_user_by_email(db, user.email)
@@ -123,4 +159,27 @@ def test_get_all_providers(db: Session) -> None:
 
     db.delete(user)
     db.delete(provider)
-    db.commit()
\ No newline at end of file
+    db.commit()
+
+def test_get_provider_ids(db: Session) -> None:
+    user = utils.create_random_user(db)
+    provider_1 = utils.activate_random_user(db, utils.create_random_provider(db))
+    provider_2 = utils.activate_random_user(db, utils.create_random_provider(db))
+    provider_ids = crud_user.get_provider_ids(db, user, [provider_1.id, user.id])
+    assert provider_ids == [str(provider_1.id)]
+    assert len(crud_user.get_provider_ids(db, limit=1)) == 1
+
+    db.delete(user)
+    db.delete(provider_1)
+    db.delete(provider_2)
+    db.commit()
+
+def test_get_all_providers_directory(db: Session) -> None:
+    provider = utils.create_random_provider(db)
+    provider = utils.activate_random_user(db, provider)
+    list_providers = crud_user.get_all_providers(db)
+    assert provider.id in [p.id for p in list_providers]
+    assert all(p.address and p.is_active for p in list_providers)
+
+    db.delete(provider)
+    db.commit()
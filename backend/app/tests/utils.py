@@ -1,13 +1,21 @@
 import random
 import string
+from contextlib import contextmanager
+from typing import Any, Generator, List, Tuple
+from sqlalchemy import event
 from sqlalchemy.orm.session import Session
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from app.models.notification import Notification
 from app.models.user import User
+from app.models.appointment import Appointment as AppointmentModel
+from app.models.occupancy import ProviderDayOccupancy
 from app.schemas.appointment import Appointment, AppointmentCreate
 from app.schemas.user import UserCreate, UserUpdate
 from app.crud import crud_user, crud_notification, crud_appointment
+from app.db.session import database, engine
+
+ASYNC_QUERY_METHODS = ("execute", "fetch_all", "fetch_one", "fetch_val")
 
 
 def create_random_user(db: Session, password: str = None) -> User:
@@ -63,6 +71,31 @@ def create_random_appointment(
     appointment_in = AppointmentCreate(provider_id=provider.id, date=date)
     return crud_appointment.create(db, appointment_in, user)
 
+def create_bulk_appointments(
+    db: Session, 
+    provider: User, 
+    user: User,
+    total: int
+) -> None:
+    """
+    Insert `total` appointments, one per hour starting tomorrow
+    """
+    start = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    start = start + timedelta(days=1)
+    db.bulk_insert_mappings(AppointmentModel, [
+        {
+            "provider_id": provider.id,
+            "user_id": user.id,
+            "date": start + timedelta(hours=i)
+        }
+        for i in range(total)
+    ])
+    db.commit()
+
+def delete_appointments(db: Session, provider: User) -> None:
+    db.query(AppointmentModel).filter_by(provider_id=provider.id).delete()
+    db.query(ProviderDayOccupancy).filter_by(provider_id=provider.id).delete()
+    db.commit()
 
 def create_random_notification(provider: User) -> Notification:
     message = random_lower_string()
@@ -77,4 +110,38 @@ def random_email() -> str:
     value_1 = "".join(random.choices(string.ascii_lowercase, k=10))
     value_2 = "".join(random.choices(string.ascii_lowercase, k=10))
 
-    return f"{value_1}@{value_2}.com"
\ No newline at end of file
+    return f"{value_1}@{value_2}.com"
+
+@contextmanager
+def count_queries() -> Generator[List[Tuple[str, Any]], None, None]:
+    """
+    Collect every SQL statement (and its parameters) sent through the engine
+    or the async database inside the block
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    def record(method):
+        async def wrapper(query, values=None, **kwargs):
+            statements.append((str(query), values))
+            return await method(query, values, **kwargs)
+        return wrapper
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    for name in ASYNC_QUERY_METHODS:
+        setattr(database, name, record(getattr(database, name)))
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        for name in ASYNC_QUERY_METHODS:
+            delattr(database, name)
+
+def explain(db: Session, statement: str, parameters: Any) -> str:
+    """
+    Return the Postgres query plan of a captured statement
+    """
+    rows = db.connection().execute(f"EXPLAIN {statement}", parameters)
+    return "\n".join(row[0] for row in rows)
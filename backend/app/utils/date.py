@@ -1,11 +1,32 @@
 from babel.dates import format_datetime, get_timezone
-from datetime import datetime
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Tuple
 
+TIMEZONE = get_timezone('America/Sao_Paulo')
 
-def format_date(date: datetime) -> str:
-    day = format_datetime(date, "dd",  locale='pt_Br')
-    month = format_datetime(date, "MMMM", locale='pt_Br')
-    hour = format_datetime(date, "HH:mm", tzinfo=get_timezone('America/Sao_Paulo'), locale='pt_Br')
+
+def format_date(date: datetime, tz: tzinfo = TIMEZONE) -> str:
+    day = format_datetime(date, "dd", tzinfo=tz, locale='pt_Br')
+    month = format_datetime(date, "MMMM", tzinfo=tz, locale='pt_Br')
+    hour = format_datetime(date, "HH:mm", tzinfo=tz, locale='pt_Br')
     date = f'dia {day} de {month.title()}, às {hour}h'
 
-    return date
\ No newline at end of file
+    return date
+
+def day_range(year: int, month: int, day: int, tz: tzinfo = TIMEZONE) -> Tuple[datetime, datetime]:
+    """
+    Half-open [start, end) range of a local day, so it can be served by an index
+    """
+    start = datetime(year, month, day)
+    end = start + timedelta(days=1)
+
+    return tz.localize(start), tz.localize(end)
+
+def to_local(date: datetime, tz: tzinfo = TIMEZONE) -> datetime:
+    """
+    Convert to the local timezone, naive dates are taken as UTC
+    """
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+
+    return date.astimezone(tz)
@@ -0,0 +1,43 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque cursor holding the sort key of the last item of a page
+    """
+    data = json.dumps(jsonable_encoder(values), separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], *types: Callable[[Any], Any]) -> Optional[Tuple]:
+    """
+    Sort key of a cursor, each value is parsed by the matching type
+    """
+    if not cursor:
+        return None
+
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(parse(value) for parse, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+def paginate(
+    items: Sequence[Any], 
+    limit: int, 
+    sort_key: Callable[[Any], Sequence[Any]]
+) -> Dict[str, Any]:
+    """
+    `items` is fetched with limit + 1 rows, the extra one only tells there is a next page
+    """
+    page: List[Any] = list(items[:limit])
+    next_cursor = None
+    if len(items) > limit:
+        next_cursor = encode_cursor(*sort_key(page[-1]))
+
+    return {"items": page, "next_cursor": next_cursor}
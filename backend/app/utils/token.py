@@ -6,4 +6,9 @@ def encode_payload(payload: dict) -> bytes:
     return jwt.encode(payload, settings.AUTH_SECRET_KEY, algorithm='HS256')
 
 def decode_token(token: str) -> dict:
-    return jwt.decode(token, settings.AUTH_SECRET_KEY, algorithm='HS256')
+    return jwt.decode(
+        token, 
+        settings.AUTH_SECRET_KEY, 
+        algorithm='HS256', 
+        options={'require_exp': True}
+    )
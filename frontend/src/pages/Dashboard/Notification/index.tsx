@@ -5,6 +5,7 @@ import ptBR from 'date-fns/locale/pt-BR';
 import Skeleton, { SkeletonTheme } from 'react-loading-skeleton';
 
 import api from '../../../services/api';
+import getPage from '../../../services/pagination';
 import { useAuth } from '../../../hooks/auth';
 import { useToast } from '../../../hooks/toast';
 
@@ -35,28 +36,61 @@ const Notifications: React.FC = () => {
   const [visible, setVisible] = useState(false);
   const [notifications, setNotifications] = useState<NotificationItem[]>([]);
   const [loadingNotifications, setLoadingNotifications] = useState(true);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const hasUnread = useMemo(
     () => !!notifications.find((notification) => notification.read === false),
     [notifications],
   );
 
+  const formatNotifications = useCallback(
+    (items: NotificationItem[]) =>
+      items.map((notification) => ({
+        ...notification,
+        timeDistance: formatDistance(
+          parseISO(notification.created_at),
+          new Date(),
+          { addSuffix: true, locale: ptBR },
+        ),
+      })),
+    [],
+  );
+
   const getNotifications = useCallback(async () => {
-    const response = await api.get('/providers/notifications');
-    const notificationsResponse = response.data as NotificationItem[];
-
-    const data = notificationsResponse.map((notification) => ({
-      ...notification,
-      timeDistance: formatDistance(
-        parseISO(notification.created_at),
-        new Date(),
-        { addSuffix: true, locale: ptBR },
-      ),
-    }));
-
-    setNotifications(data);
+    const page = await getPage<NotificationItem>('/providers/notifications');
+
+    setNotifications(formatNotifications(page.items));
+    setCursor(page.next_cursor);
     setLoadingNotifications(false);
-  }, []);
+  }, [formatNotifications]);
+
+  const handleLoadMore = useCallback(async () => {
+    if (!cursor || loadingMore) {
+      return;
+    }
+
+    setLoadingMore(true);
+    try {
+      const page = await getPage<NotificationItem>(
+        '/providers/notifications',
+        {},
+        cursor,
+      );
+
+      setNotifications((items) => [
+        ...items,
+        ...formatNotifications(page.items),
+      ]);
+      setCursor(page.next_cursor);
+    } catch (error) {
+      if (error.response.status === 401) {
+        signOut();
+      }
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [cursor, formatNotifications, loadingMore, signOut]);
 
   const handleToggleVisible = useCallback(() => {
     setVisible(!visible);
@@ -106,7 +140,7 @@ const Notifications: React.FC = () => {
     <Container>
       {!loadingNotifications ? (
         <Badge
-          title={`${notifications.length} notificações`}
+          title={`${notifications.length}${cursor ? '+' : ''} notificações`}
           onClick={handleToggleVisible}
           hasUnread={hasUnread}
         >
@@ -119,7 +153,7 @@ const Notifications: React.FC = () => {
       )}
 
       <NotificationList visible={visible}>
-        <Scroll>
+        <Scroll onYReachEnd={handleLoadMore}>
           {notifications.length > 0 ? (
             notifications.map((notification) => (
               <Notification key={notification.id} unread={!notification.read}>
@@ -9,6 +9,7 @@ import { Link } from 'react-router-dom';
 import { useAuth } from '../../hooks/auth';
 import logoImg from '../../assets/logo.svg';
 import api from '../../services/api';
+import getPage from '../../services/pagination';
 import Notification from './Notification';
 
 import 'react-day-picker/lib/style.css';
@@ -23,6 +24,7 @@ import {
   NextAppointment,
   Section,
   Appointment,
+  LoadMore,
   Calendar,
 } from './styles';
 
@@ -60,6 +62,32 @@ const Dashboard: React.FC = () => {
   const [providerAppointments, setProviderAppointments] = useState<
     AppointmentItem[]
   >([]);
+  const [appointmentsCursor, setAppointmentsCursor] = useState<string | null>(
+    null,
+  );
+  const [loadingMoreAppointments, setLoadingMoreAppointments] = useState(
+    false,
+  );
+
+  const appointmentsParams = useMemo(
+    () => ({
+      day: selectedDate.getDate(),
+      month: selectedMonth.getMonth() + 1,
+      year: selectedMonth.getFullYear(),
+    }),
+    [selectedDate, selectedMonth],
+  );
+
+  const formatAppointments = useCallback(
+    (items: AppointmentItem[]) =>
+      items.map((appointment) => {
+        return {
+          ...appointment,
+          hour: format(parseISO(appointment.date), 'HH:mm'),
+        };
+      }),
+    [],
+  );
 
   useEffect(() => {
     api
@@ -82,24 +110,10 @@ const Dashboard: React.FC = () => {
   }, [selectedMonth, signOut, user]);
 
   useEffect(() => {
-    api
-      .get<AppointmentItem[]>('/providers/me', {
-        params: {
-          day: selectedDate.getDate(),
-          month: selectedMonth.getMonth() + 1,
-          year: selectedMonth.getFullYear(),
-        },
-      })
-      .then((response) => {
-        const providerAppointmentsFormatted = response.data.map(
-          (appointment) => {
-            return {
-              ...appointment,
-              hour: format(parseISO(appointment.date), 'HH:mm'),
-            };
-          },
-        );
-        setProviderAppointments(providerAppointmentsFormatted);
+    getPage<AppointmentItem>('/providers/me', appointmentsParams)
+      .then((page) => {
+        setProviderAppointments(formatAppointments(page.items));
+        setAppointmentsCursor(page.next_cursor);
         setLoadingProviderAppointments(false);
       })
       .catch((error) => {
@@ -107,7 +121,39 @@ const Dashboard: React.FC = () => {
           signOut();
         }
       });
-  }, [selectedDate, selectedMonth, signOut, user]);
+  }, [appointmentsParams, formatAppointments, signOut, user]);
+
+  const handleLoadMoreAppointments = useCallback(() => {
+    if (!appointmentsCursor || loadingMoreAppointments) {
+      return;
+    }
+
+    setLoadingMoreAppointments(true);
+    getPage<AppointmentItem>(
+      '/providers/me',
+      appointmentsParams,
+      appointmentsCursor,
+    )
+      .then((page) => {
+        setProviderAppointments((appointments) => [
+          ...appointments,
+          ...formatAppointments(page.items),
+        ]);
+        setAppointmentsCursor(page.next_cursor);
+      })
+      .catch((error) => {
+        if (error.response.status === 401) {
+          signOut();
+        }
+      })
+      .finally(() => setLoadingMoreAppointments(false));
+  }, [
+    appointmentsCursor,
+    appointmentsParams,
+    formatAppointments,
+    loadingMoreAppointments,
+    signOut,
+  ]);
 
   const handleDateChange = useCallback((day: Date, modifiers: DayModifiers) => {
     if (modifiers.available && !modifiers.disabled) {
@@ -317,6 +363,16 @@ const Dashboard: React.FC = () => {
               </SkeletonTheme>
             )}
           </Section>
+
+          {!loadingProviderAppointments && appointmentsCursor && (
+            <LoadMore
+              type="button"
+              onClick={handleLoadMoreAppointments}
+              disabled={loadingMoreAppointments}
+            >
+              {loadingMoreAppointments ? 'Carregando...' : 'Carregar mais'}
+            </LoadMore>
+          )}
         </Schedule>
 
         <Calendar>
@@ -222,6 +222,27 @@ export const Appointment = styled.div`
   }
 `;
 
+export const LoadMore = styled.button`
+  margin-top: 24px;
+  width: 100%;
+  height: 48px;
+  background: #3e3b47;
+  border: 0;
+  border-radius: 10px;
+  color: #ff9000;
+  font-weight: 500;
+  transition: background-color 0.2s;
+
+  &:hover {
+    background: ${shade(0.2, '#3e3b47')};
+  }
+
+  &:disabled {
+    opacity: 0.6;
+    cursor: default;
+  }
+`;
+
 export const Calendar = styled.aside`
   width: 380px;
   .DayPicker {
@@ -10,6 +10,7 @@ import SkeletonContent from 'react-native-skeleton-content';
 
 import { useAuth } from '../../../hooks/auth';
 import api from '../../../services/api';
+import getPage from '../../../services/pagination';
 import swapArrayOfProviders from '../../../utils/swapArrayOfProviders';
 
 import {
@@ -73,6 +74,8 @@ const CreateAppointment: React.FC = () => {
   const [block, setBlock] = useState(false);
   const [loading, setLoading] = useState(true);
   const [modalVisible, setModalVisible] = useState(false);
+  const [providersCursor, setProvidersCursor] = useState<string | null>(null);
+  const [loadingMoreProviders, setLoadingMoreProviders] = useState(false);
 
   useEffect(() => {
     navigation.addListener('focus', () => {
@@ -99,14 +102,11 @@ const CreateAppointment: React.FC = () => {
   }, [navigation, selectedDate, selectedProvider, signOut]);
 
   useEffect(() => {
-    api
-      .get('/providers')
-      .then((response) => {
-        const providersSwapped = swapArrayOfProviders(
-          response.data,
-          providerId,
-        );
+    getPage<ProviderItem>('/providers')
+      .then((page) => {
+        const providersSwapped = swapArrayOfProviders(page.items, providerId);
         setProviders(providersSwapped);
+        setProvidersCursor(page.next_cursor);
         setLoading(false);
       })
       .catch((error) => {
@@ -116,6 +116,31 @@ const CreateAppointment: React.FC = () => {
       });
   }, [providerId, signOut]);
 
+  const handleLoadMoreProviders = useCallback(() => {
+    if (!providersCursor || loadingMoreProviders) {
+      return;
+    }
+
+    setLoadingMoreProviders(true);
+    getPage<ProviderItem>('/providers', {}, providersCursor)
+      .then((page) => {
+        setProviders((items) => [
+          ...items,
+          // the selected provider may already be first in the list
+          ...page.items.filter(
+            (item) => !items.some((provider) => provider.id === item.id),
+          ),
+        ]);
+        setProvidersCursor(page.next_cursor);
+      })
+      .catch((error) => {
+        if (error.response.status === 401) {
+          signOut();
+        }
+      })
+      .finally(() => setLoadingMoreProviders(false));
+  }, [loadingMoreProviders, providersCursor, signOut]);
+
   useEffect(() => {
     api
       .get('/providers/day-availability', {
@@ -280,6 +305,8 @@ const CreateAppointment: React.FC = () => {
               showsHorizontalScrollIndicator={false}
               data={providers}
               keyExtractor={(provider) => provider.id}
+              onEndReached={handleLoadMoreProviders}
+              onEndReachedThreshold={0.5}
               renderItem={({ item: provider }) => (
                 <ProviderContainer
                   onPress={() => handleSelectProvider(provider.id)}
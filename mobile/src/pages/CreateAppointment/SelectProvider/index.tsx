@@ -4,7 +4,7 @@ import Icon from '@expo/vector-icons/build/Feather';
 import SkeletonContent from 'react-native-skeleton-content';
 
 import { useAuth } from '../../../hooks/auth';
-import api from '../../../services/api';
+import getPage from '../../../services/pagination';
 
 import {
   Container,
@@ -37,14 +37,16 @@ const Dashboard: React.FC = () => {
   const [providers, setProviders] = useState<ProviderItem[]>([]);
   const [block, setBlock] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     navigation.addListener('focus', () => {
       setBlock(false);
-      api
-        .get('/providers')
-        .then((response) => {
-          setProviders(response.data);
+      getPage<ProviderItem>('/providers')
+        .then((page) => {
+          setProviders(page.items);
+          setCursor(page.next_cursor);
           setLoading(false);
         })
         .catch((error) => {
@@ -55,6 +57,25 @@ const Dashboard: React.FC = () => {
     });
   }, [navigation, signOut]);
 
+  const handleLoadMore = useCallback(() => {
+    if (!cursor || loadingMore) {
+      return;
+    }
+
+    setLoadingMore(true);
+    getPage<ProviderItem>('/providers', {}, cursor)
+      .then((page) => {
+        setProviders((items) => [...items, ...page.items]);
+        setCursor(page.next_cursor);
+      })
+      .catch((error) => {
+        if (error.response.status === 401) {
+          signOut();
+        }
+      })
+      .finally(() => setLoadingMore(false));
+  }, [cursor, loadingMore, signOut]);
+
   const navigateToCreateAppointment = useCallback(
     (providerId: string) => {
       if (!block) {
@@ -111,11 +132,13 @@ const Dashboard: React.FC = () => {
         <ProvidersList
           data={providers}
           keyExtractor={(provider) => provider.id}
+          onEndReached={handleLoadMore}
+          onEndReachedThreshold={0.5}
           ListHeaderComponent={<ProviderListTitle>Selecione</ProviderListTitle>}
           ListFooterComponent={
             // eslint-disable-next-line react/jsx-wrap-multilines
             <ProviderListFooterTitle>
-              Estes são todos os resultados
+              {cursor ? 'Carregando...' : 'Estes são todos os resultados'}
             </ProviderListFooterTitle>
           }
           renderItem={({ item: provider }) => (
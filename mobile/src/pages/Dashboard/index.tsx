@@ -7,7 +7,7 @@ import ptBR from 'date-fns/locale/pt-BR';
 import SkeletonContent from 'react-native-skeleton-content';
 
 import { useAuth } from '../../hooks/auth';
-import api from '../../services/api';
+import getPage from '../../services/pagination';
 
 import {
   Container,
@@ -50,14 +50,16 @@ const Dashboard: React.FC = () => {
   const [appointments, setAppointments] = useState<AppointmentItem[]>([]);
   const [block, setBlock] = useState(false);
   const [loading, setLoading] = useState(true);
+  const [cursor, setCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     navigation.addListener('focus', () => {
       setBlock(false);
-      api
-        .get('/users/me')
-        .then((response) => {
-          setAppointments(response.data);
+      getPage<AppointmentItem>('/users/me')
+        .then((page) => {
+          setAppointments(page.items);
+          setCursor(page.next_cursor);
           setLoading(false);
         })
         .catch((error) => {
@@ -68,6 +70,25 @@ const Dashboard: React.FC = () => {
     });
   }, [navigation, signOut]);
 
+  const handleLoadMore = useCallback(() => {
+    if (!cursor || loadingMore) {
+      return;
+    }
+
+    setLoadingMore(true);
+    getPage<AppointmentItem>('/users/me', {}, cursor)
+      .then((page) => {
+        setAppointments((items) => [...items, ...page.items]);
+        setCursor(page.next_cursor);
+      })
+      .catch((error) => {
+        if (error.response.status === 401) {
+          signOut();
+        }
+      })
+      .finally(() => setLoadingMore(false));
+  }, [cursor, loadingMore, signOut]);
+
   const appointmentsFormatted = useMemo(() => {
     return appointments.map(({ id, date, provider }) => {
       const value = format(new Date(date), "dd 'de' MMMM", { locale: ptBR });
@@ -138,6 +159,8 @@ const Dashboard: React.FC = () => {
           <AppointmentsList
             data={appointmentsFormatted}
             keyExtractor={(appointment) => appointment.id}
+            onEndReached={handleLoadMore}
+            onEndReachedThreshold={0.5}
             ListHeaderComponent={
               <AppointmentListTitle>Compromissos marcado</AppointmentListTitle>
             }
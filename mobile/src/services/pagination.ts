@@ -0,0 +1,22 @@
+import api from './api';
+
+export interface Page<T> {
+  items: T[];
+  next_cursor: string | null;
+}
+
+/**
+ * Loads one page of a cursor paginated listing, the next one is asked with
+ * the returned next_cursor only when the user wants more
+ */
+export default async function getPage<T>(
+  url: string,
+  params: Record<string, unknown> = {},
+  cursor: string | null = null,
+): Promise<Page<T>> {
+  const response = await api.get<Page<T>>(url, {
+    params: cursor ? { ...params, cursor } : params,
+  });
+
+  return response.data;
+}
@@ -12,6 +12,10 @@ export default function swapArrayOfProviders(
 ): ProviderItem[] {
   const swap = swapProviders[0];
   const idx = swapProviders.findIndex((item) => item.id === providerId);
+  // only the first page is loaded, the provider may be on a later one
+  if (idx < 0) {
+    return swapProviders;
+  }
   swapProviders[0] = swapProviders[idx];
   swapProviders[idx] = swap;
   return swapProviders;